@@ -0,0 +1,310 @@
+"""Headless performance benchmarks for extraction, diff engines and grouping.
+
+Run from the repository root:
+
+    python -m benchmarks.bench                      # quick profile, table on stdout
+    python -m benchmarks.bench --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench --compare benchmarks/baseline.json
+
+The exit code is 1 when the vectorized chars_to_word_columns() does not
+give exactly the words of chars_to_words(), or, with --compare, when any
+stage got slower than the baseline by more than --tolerance. Baseline times
+are first scaled to this machine by a calibration workload (see calibrate).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pymupdf as fitz
+
+from comparemethods.engines import EngineUnavailable, load as load_engine
+from src.metrics import peak_rss_mb
+from src.pdfworker import PDFWorker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED_PAIR = (os.path.join(REPO_ROOT, "bp2left.pdf"), os.path.join(REPO_ROOT, "bp2right.pdf"))
+
+PROFILES = {
+    # (pages, edit density)
+    "quick": [(5, 0.01), (20, 0.01), (20, 0.05)],
+    "full": [(5, 0.001), (5, 0.01), (5, 0.05),
+             (50, 0.001), (50, 0.01), (50, 0.05),
+             (200, 0.001), (200, 0.01), (200, 0.05)],
+}
+WORDS_PER_PAGE = 300
+
+# Some engines blow up on big inputs (MyersDiff keeps a V array per edit step).
+# Skip them above these sizes so a benchmark run can't take the machine down.
+ENGINE_LIMITS = {
+    "myers": lambda n, m, edits: (n + m) * 2 * edits <= 2e8,
+    "deepdiff": lambda n, m, edits: n + m <= 60000,
+}
+
+
+# --- memory -------------------------------------------------------------------
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS counter (Linux only). Returns False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(fn, repeat=1):
+    """Run fn `repeat` times; return (best wall time, peak RSS MB, last result)."""
+    best = None
+    peak = 0.0
+    result = None
+    for _ in range(repeat):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = max(peak, peak_rss_mb())
+        best = elapsed if best is None else min(best, elapsed)
+    return best, peak, result
+
+
+def calibrate(repeat=9):
+    """Median seconds a fixed pure-Python workload takes here.
+
+    It runs no code from this repository, so a regression can't hide in it.
+    Reports store it and --compare scales the baseline by the ratio, which
+    lets a baseline recorded on other hardware still be compared against.
+    The median rather than the best run, so it also sees a busy machine."""
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(200000)]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = {}
+        for x in sorted(data):
+            counts[int(x * 1000)] = counts.get(int(x * 1000), 0) + 1
+        "".join(str(count) for count in counts.values())
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+# --- synthetic documents ---------------------------------------------------------
+
+def _vocabulary(rng, size=5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+    # A handful of very frequent tokens, like "the" or section signs in real documents
+    return ["the", "of", "and", "§", "1.", "2."] + vocab
+
+
+def _zipf_words(rng, vocab, count):
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    return rng.choices(vocab, weights=weights, k=count)
+
+
+def _edit(rng, vocab, words, density):
+    out = []
+    for word in words:
+        if rng.random() >= density:
+            out.append(word)
+            continue
+        op = rng.random()
+        if op < 1 / 3:
+            continue  # delete
+        if op < 2 / 3:
+            out.append(rng.choice(vocab))  # replace
+        else:
+            out.extend([word, rng.choice(vocab)])  # insert
+    return out
+
+
+def _write_pdf(path, words):
+    doc = fitz.open()
+    for start in range(0, max(len(words), 1), WORDS_PER_PAGE):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50),
+                            " ".join(words[start:start + WORDS_PER_PAGE]), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def synthetic_pair(data_dir, pages, density, seed=1234):
+    """Create (or reuse) a deterministic left/right PDF pair; returns the two paths."""
+    name = f"synthetic-p{pages}-d{density}-s{seed}"
+    left, right = os.path.join(data_dir, name + "-left.pdf"), os.path.join(data_dir, name + "-right.pdf")
+    if not (os.path.exists(left) and os.path.exists(right)):
+        rng = random.Random(seed)
+        vocab = _vocabulary(rng)
+        words = _zipf_words(rng, vocab, pages * WORDS_PER_PAGE)
+        _write_pdf(left, words)
+        _write_pdf(right, _edit(rng, vocab, words, density))
+    return left, right
+
+
+# --- benchmark --------------------------------------------------------------------
+
+def bench_case(name, left, right, engines, repeat):
+    results = []
+
+    def record(stage, wall, peak, **extra):
+        row = {"case": name, "stage": stage, "wall_s": round(wall, 6), "peak_rss_mb": round(peak, 1)}
+        row.update(extra)
+        results.append(row)
+        print(f"{name:32} {stage:28} {wall:9.4f}s {peak:9.1f} MB"
+              + "".join(f"  {k}={v}" for k, v in extra.items()), flush=True)
+
+    worker = PDFWorker(extract_workers=1)
+    worker.WORD_CACHE_SIZE = 0  # time real extraction on every repeat
+    wall, peak, _ = measure(lambda: (worker.LoadPDF_Left(left), worker.LoadPDF_Right(right)), repeat)
+    words_left, words_right = worker.pdfDTOLeft.words, worker.pdfDTORight.words
+    record("load", wall, peak, words=len(words_left) + len(words_right))
+
+    # chars_to_words on its own, without the MuPDF extraction, next to its vectorized fast path
+    pdf = worker.pdfDTOLeft.pdf_data
+    rawdicts = [pdf.load_page(p).get_text("rawdict") for p in range(pdf.page_count)]
+    wall, peak, reference = measure(lambda: [PDFWorker.chars_to_words(rd, p) for p, rd in enumerate(rawdicts)], repeat)
+    record("chars_to_words", wall, peak, pages=pdf.page_count)
+    wall, peak, columns = measure(lambda: [PDFWorker.chars_to_word_columns(rd) for rd in rawdicts], repeat)
+    record("chars_to_word_columns", wall, peak, parity="ok" if words_match(reference, columns) else "FAILED")
+    del rawdicts, reference, columns
+
+    diff_result = None
+    n, m = len(words_left), len(words_right)
+    # Until an engine has run, guess the edit distance pessimistically
+    edits = max(abs(n - m), n // 50)
+    for engine_name in engines:
+        try:
+            method = load_engine(engine_name)
+        except EngineUnavailable as e:
+            print(f"{name:32} {'engine:' + engine_name:28} skipped ({e})", flush=True)
+            continue
+        limit = ENGINE_LIMITS.get(engine_name)
+        if limit and not limit(n, m, edits):
+            print(f"{name:32} {'engine:' + engine_name:28} skipped (input too large)", flush=True)
+            continue
+        wall, peak, (added, removed) = measure(lambda: worker._run_engine(method, words_left, words_right), repeat)
+        record("engine:" + engine_name, wall, peak, diff_size=len(added) + len(removed))
+        if diff_result is None or engine_name == "linear-myers":
+            diff_result = (added, removed)
+            edits = len(added) + len(removed)
+
+    if diff_result is not None:
+        added, removed = diff_result
+        added_diffs = [(idx, "added") for idx, _ in added]
+        removed_diffs = [(idx, "removed") for idx, _ in removed]
+        wall, peak, groups = measure(lambda: (worker.group_adjacent_words(removed_diffs, words_left)
+                                              + worker.group_adjacent_words(added_diffs, words_right)), repeat)
+        record("group_adjacent_words", wall, peak, groups=len(groups))
+
+    worker.close()
+    return results
+
+
+def words_match(reference, columns):
+    """True if chars_to_word_columns() gave exactly the words of chars_to_words(), page by page."""
+    return len(reference) == len(columns) and all(
+        [w["text"] for w in words] == texts and [w["bbox"] for w in words] == bbox.tolist()
+        for words, (texts, bbox) in zip(reference, columns))
+
+
+def baseline_scale(calibration, baseline):
+    """Factor turning the baseline's times into expected times on this machine (see calibrate)."""
+    reference = baseline.get("meta", {}).get("calibration_s")
+    if not reference or not calibration:
+        print("warning: the baseline has no calibration; its times are only comparable on the machine "
+              "that recorded it", file=sys.stderr)
+        return 1.0
+    return calibration / reference
+
+
+def compare_to_baseline(results, baseline, tolerance, calibration=None):
+    """Return (row, expected row) for rows slower than the baseline by more than tolerance.
+
+    Baseline times are scaled by baseline_scale() first."""
+    scale = baseline_scale(calibration, baseline)
+    base = {(r["case"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for row in results:
+        ref = base.get((row["case"], row["stage"]))
+        # Ignore stages under 20 ms; their timing is mostly noise
+        if ref and ref["wall_s"] * scale > 0.02 and row["wall_s"] > ref["wall_s"] * scale * (1 + tolerance):
+            regressions.append((row, dict(ref, wall_s=ref["wall_s"] * scale)))
+    return regressions
+
+
+def parse_args(argv=None):
+    # Engines are listed in a fixed order so the fastest linear-space one runs first
+    all_engines = ["linear-myers", "histogram", "sequencematcher", "myers", "hirschberg", "deepdiff"]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--engines", default=",".join(all_engines),
+                        help="comma separated engine names (default: all)")
+    parser.add_argument("--no-bundled", action="store_true", help="skip the bundled bp2 pair")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the best time is kept")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pdf-comparator-bench"),
+                        help="where generated PDFs are kept between runs")
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results as the new baseline")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    engines = [e for e in args.engines.split(",") if e]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    cases = []
+    if not args.no_bundled:
+        cases.append(("bp2", *BUNDLED_PAIR))
+    for pages, density in PROFILES[args.profile]:
+        cases.append((f"synthetic-p{pages}-d{density}", *synthetic_pair(args.data_dir, pages, density)))
+
+    calibration = calibrate()
+    results = []
+    for name, left, right in cases:
+        results.extend(bench_case(name, left, right, engines, args.repeat))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+            "profile": args.profile,
+            "calibration_s": round(calibration, 6),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    exit_code = 0
+    for row in results:
+        if row.get("parity") == "FAILED":
+            print(f"PARITY FAILED {row['case']} {row['stage']}")
+            exit_code = 1
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, calibration)
+        for row, ref in regressions:
+            print(f"REGRESSION {row['case']} {row['stage']}: {row['wall_s']:.4f}s vs {ref['wall_s']:.4f}s expected")
+        if regressions:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
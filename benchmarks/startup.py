@@ -0,0 +1,136 @@
+"""Import-time and cold-start benchmark.
+
+Run from the repository root:
+
+    python -m benchmarks.startup                    # table on stdout
+    python -m benchmarks.startup --repeat 5 --output startup.json
+    python -m benchmarks.startup --compare startup.json
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported. first_window is the wall time from launching Python to the main
+window's first event loop turn (offscreen unless QT_QPA_PLATFORM is set).
+engine:<name> is what selecting an engine costs the first time. Rows also
+list which heavy optional packages got imported along the way.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Packages that only some engines or features need; none should load at startup
+OPTIONAL = ("deepdiff", "PIL", "Bio")
+
+_REPORT = f"""
+import json, sys
+print(json.dumps({{"seconds": elapsed, "optional": [m for m in {OPTIONAL!r} if m in sys.modules]}}))
+"""
+
+_IMPORT = """
+import time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+"""
+
+_ENGINE = """
+import time
+from src.pdfworker import PDFWorker
+worker = PDFWorker()
+start = time.perf_counter()
+worker.select_compare_method({name!r})
+elapsed = time.perf_counter() - start
+"""
+
+_WINDOW = """
+import sys
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+from src.pdfcomparator import PDFComparator
+app = QApplication(sys.argv)
+window = PDFComparator()
+window.show()
+QTimer.singleShot(0, app.quit)
+app.exec()
+elapsed = None
+""" + _REPORT
+
+MODULES = ["src.pdfworker", "src.batchcompare", "src.pdfviewer", "src.pdfcomparator"]
+ENGINES = ["myers", "linear-myers", "histogram", "deepdiff"]
+
+
+def run_child(code):
+    """Run code in a fresh interpreter; return (process wall time, its report)."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "child failed")
+    # Libraries may print to stdout; the report is the last line
+    return wall, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench(repeat):
+    results = []
+
+    def record(stage, code, use_wall=False):
+        best, report = None, None
+        try:
+            for _ in range(repeat):
+                wall, report = run_child(code)
+                seconds = wall if use_wall else report["seconds"]
+                best = seconds if best is None else min(best, seconds)
+        except RuntimeError as e:
+            print(f"{stage:28} failed ({e})", flush=True)
+            return
+        row = {"case": "startup", "stage": stage, "wall_s": round(best, 6), "optional": report["optional"]}
+        results.append(row)
+        print(f"{stage:28} {best:9.4f}s  optional={','.join(report['optional']) or '-'}", flush=True)
+
+    record("interpreter", "elapsed = None" + _REPORT, use_wall=True)
+    for module in MODULES:
+        record("import:" + module, _IMPORT.format(module=module) + _REPORT)
+    for name in ENGINES:
+        record("engine:" + name, _ENGINE.format(name=name) + _REPORT)
+    record("first_window", _WINDOW, use_wall=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best time is kept")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against --compare (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from benchmarks.bench import calibrate, compare_to_baseline
+    args = parse_args(argv)
+    calibration = calibrate()
+    results = bench(args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": {"python": sys.version.split()[0], "calibration_s": round(calibration, 6),
+                                "date": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                       "results": results}, f, indent=2)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for row, ref in compare_to_baseline(results, baseline, args.tolerance, calibration):
+            print(f"REGRESSION {row['stage']}: {row['wall_s']:.4f}s vs {ref['wall_s']:.4f}s expected")
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.batchcompare import compare_pair, read_manifest, EXIT_SAME, EXIT_ERROR
+from comparemethods import engines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare PDF pairs without the GUI. "
+                    "Exit code: 0 = no differences, 1 = differences found, 2 = an error occurred.")
+    parser.add_argument("paths", nargs="*", metavar="LEFT RIGHT",
+                        help="pairs of PDF paths: left1 right1 [left2 right2 ...]")
+    parser.add_argument("-m", "--manifest", help="file with one pair per line (left<TAB>right or JSON)")
+    parser.add_argument("--method", choices=engines.names(), default=engines.DEFAULT, help="comparison engine")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of pairs compared in parallel")
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson",
+                        help="ndjson streams one record per pair as it finishes; "
+                             "json writes a single array in input order")
+    parser.add_argument("--cache-dir", help="enable the on-disk extraction cache in this directory")
+    parser.add_argument("--memory-limit", type=int, metavar="MB",
+                        help="compare out-of-core: spill words to disk and diff in windows that keep each "
+                             "comparison near this RSS; may report slightly more changes than a global diff")
+    args = parser.parse_args(argv)
+    if len(args.paths) % 2:
+        parser.error("paths must come in LEFT RIGHT pairs")
+    if not args.paths and not args.manifest:
+        parser.error("give LEFT RIGHT pairs or --manifest")
+    return args
+
+
+def run(args, out):
+    pairs = list(zip(args.paths[0::2], args.paths[1::2]))
+    if args.manifest:
+        pairs += read_manifest(args.manifest)
+
+    records = [None] * len(pairs)
+    exit_code = EXIT_SAME
+
+    def emit(index, record):
+        nonlocal exit_code
+        record["index"] = index
+        exit_code = max(exit_code, record["exit_code"])
+        if args.format == "ndjson":
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+        else:
+            records[index] = record
+
+    if args.jobs <= 1 or len(pairs) == 1:
+        for index, (left, right) in enumerate(pairs):
+            emit(index, compare_pair(left, right, args.method, args.cache_dir, args.memory_limit))
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(pairs))) as pool:
+            futures = {pool.submit(compare_pair, left, right, args.method, args.cache_dir, args.memory_limit): index
+                       for index, (left, right) in enumerate(pairs)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:  # the worker process itself died
+                    left, right = pairs[index]
+                    record = {"left": left, "right": right, "method": args.method, "status": "error",
+                              "exit_code": EXIT_ERROR, "error": f"{type(e).__name__}: {e}"}
+                emit(index, record)
+
+    if args.format == "json":
+        json.dump(records, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    return exit_code
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            return run(args, out)
+    return run(args, sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,7 +19,6 @@ class DeepDiffCompare:
             for path, value in diff['iterable_item_removed'].items():
                 index = int(path.split('[')[-1].rstrip(']'))
                 removed.append([index, value])
-        print("DeepDiffCompare module loaded successfully.")
 
         return added, removed
     
@@ -0,0 +1,56 @@
+"""Comparison engines by short name, imported only when first used.
+
+An engine is a class taking the left and right word lists, whose
+get_diff_as_string() returns (added, removed): lists of (index, word),
+ascending. An engine whose class sets accepts_token_ids = True only ever
+compares words for equality, so PDFWorker may pass it integer token ids
+instead of strings, which compare faster.
+
+Every engine is listed even if an optional package it needs is missing:
+missing_packages() tells without importing anything, and load() raises
+EngineUnavailable instead of failing at startup."""
+import importlib
+import importlib.util
+
+# Short name -> (label in the GUI, module, class, optional packages it needs), in menu order
+ENGINES = {
+    "myers": ("Myers Diff (Default)", "comparemethods.myersdiff", "MyersDiff", ()),
+    "deepdiff": ("DeepDiff", "comparemethods.deepdiffcompare", "DeepDiffCompare", ("deepdiff",)),
+    "sequencematcher": ("SequenceMatcher", "comparemethods.sequencematchercompare", "SequenceMatcherCompare", ()),
+    "hirschberg": ("Hirschberg", "comparemethods.hirschbergcompare", "HirschbergCompare", ()),
+    "linear-myers": ("Myers Diff (Linear Space)", "comparemethods.linearmyersdiff", "LinearMyersDiff", ()),
+    "histogram": ("Histogram Diff", "comparemethods.histogramdiff", "HistogramDiff", ()),
+}
+DEFAULT = "myers"
+
+
+class EngineUnavailable(ImportError):
+    """Raised by load() when an engine's module or one of its packages can't be imported."""
+    pass
+
+
+def names():
+    return list(ENGINES)
+
+
+def label(name):
+    return ENGINES[name][0]
+
+
+def missing_packages(name):
+    """Optional packages of the engine that are not installed."""
+    return [package for package in ENGINES[name][3] if importlib.util.find_spec(package) is None]
+
+
+def load(name):
+    """The engine class registered under name; its module is imported on first use."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown compare method {name!r}; expected one of {', '.join(ENGINES)}")
+    engine_label, module, class_name, _ = ENGINES[name]
+    missing = missing_packages(name)
+    if missing:
+        raise EngineUnavailable(f"{engine_label} needs {', '.join(missing)}: pip install {' '.join(missing)}")
+    try:
+        return getattr(importlib.import_module(module), class_name)
+    except ImportError as e:
+        raise EngineUnavailable(f"{engine_label} can't be loaded: {e}") from e
@@ -1,52 +1,113 @@
-from Bio.Align import PairwiseAligner
+import numpy as np
+
+from comparemethods.segments import diff_segments
+
 
 class HirschbergCompare:
+    """Word-level LCS diff using Hirschberg's divide-and-conquer in linear space.
+
+    Each split needs the last row of the LCS table for one half of the left
+    words against the right words. Rows are computed bit-parallel: one
+    Python int holds a whole row, so each left word costs a few big-int
+    operations. The result is an optimal (longest common subsequence) diff."""
+    accepts_token_ids = True
+    # Subproblems with at most this many cells are solved with a plain DP table
+    SMALL_CELLS = 4096
+    # Upper bound on the memory used to cache match masks of frequent words
+    MASK_CACHE_BYTES = 32 * 1024 * 1024
+
     def __init__(self, left_words, right_words):
         self.left_words = left_words
         self.right_words = right_words
 
     def get_diff_as_string(self):
-        aligner = PairwiseAligner()
-        aligner.mode = "global"
+        a, b = self.left_words, self.right_words
+        # Work on small ints so the rows can be computed with NumPy/bit tricks
+        index = {}
+        a_ids = [index.setdefault(w, len(index)) for w in a]
+        b_ids = [index.setdefault(w, len(index)) for w in b]
+        self._a, self._b = a_ids, b_ids
+        self._b_arr = np.array(b_ids, dtype=np.int64)
+        added, removed = diff_segments(a_ids, b_ids, self._split, words=(a, b))
+        self._a = self._b = self._b_arr = None
+        return added, removed
 
-        # Convert list of words into strings
-        seq_left = " ".join(self.left_words)
-        seq_right = " ".join(self.right_words)
+    def _split(self, a_lo, a_hi, b_lo, b_hi):
+        n, m = a_hi - a_lo, b_hi - b_lo
+        if n == 1 or n * m <= self.SMALL_CELLS:
+            return ([], *self._small_lcs(a_lo, a_hi, b_lo, b_hi))
+        a_mid = (a_lo + a_hi) // 2
+        forward = self._lcs_row(self._a[a_lo:a_mid], b_lo, b_hi, reverse=False)
+        backward = self._lcs_row(self._a[a_mid:a_hi][::-1], b_lo, b_hi, reverse=True)
+        # forward[k] + backward[m - k]: LCS if the first k right words go with the first half
+        k = int(np.argmax(forward + backward[::-1]))
+        return [(a_lo, a_mid, b_lo, b_lo + k), (a_mid, a_hi, b_lo + k, b_hi)], (), ()
 
-        alignments = aligner.align(seq_left, seq_right)
-        aligned = alignments[0]
+    def _lcs_row(self, rows, b_lo, b_hi, reverse):
+        """LCS lengths of `rows` against every prefix of b[b_lo:b_hi] (or suffix, if reverse).
 
-        # We can’t directly get word-level indices from char alignment,
-        # so split back to words and diff manually.
-        added, removed = [], []
-        left_index, right_index = 0, 0
+        Returns an int array of length m+1. Uses the bit-parallel recurrence
+        V = (V + (V & M)) | (V - (V & M)); zero bits of V mark where the row grows."""
+        m = b_hi - b_lo
+        segment = self._b_arr[b_lo:b_hi]
+        order = np.argsort(segment, kind="stable")
+        tokens, starts, counts = np.unique(segment[order], return_index=True, return_counts=True)
+        spans = dict(zip(tokens.tolist(), zip(starts.tolist(), (starts + counts).tolist())))
 
-        left_words = self.left_words
-        right_words = self.right_words
+        full = (1 << m) - 1
+        v = full
+        masks = {}
+        cache_budget = self.MASK_CACHE_BYTES
+        for token in rows:
+            mask = masks.get(token)
+            if mask is None:
+                span = spans.get(token)
+                if span is None:
+                    continue  # no match anywhere in the row, nothing changes
+                positions = order[span[0]:span[1]]
+                if reverse:
+                    positions = m - 1 - positions
+                bits = np.zeros(m, dtype=bool)
+                bits[positions] = True
+                mask = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+                if cache_budget >= m // 8:
+                    masks[token] = mask
+                    cache_budget -= m // 8
+            u = v & mask
+            v = ((v + u) | (v - u)) & full
 
-        # Simple manual diff logic
-        while left_index < len(left_words) and right_index < len(right_words):
-            if left_words[left_index] == right_words[right_index]:
-                left_index += 1
-                right_index += 1
-            else:
-                # word mismatch: check which side differs
-                if right_words[right_index] not in left_words[left_index:]:
-                    added.append((right_index, right_words[right_index]))
-                    right_index += 1
-                elif left_words[left_index] not in right_words[right_index:]:
-                    removed.append((left_index, left_words[left_index]))
-                    left_index += 1
-                else:
-                    left_index += 1
-                    right_index += 1
+        raw = np.frombuffer(v.to_bytes((m + 7) // 8, "little"), dtype=np.uint8)
+        grows = 1 - np.unpackbits(raw, bitorder="little")[:m].astype(np.int64)
+        row = np.zeros(m + 1, dtype=np.int64)
+        np.cumsum(grows, out=row[1:])
+        return row
 
-        # catch tail ends
-        while left_index < len(left_words):
-            removed.append((left_index, left_words[left_index]))
-            left_index += 1
-        while right_index < len(right_words):
-            added.append((right_index, right_words[right_index]))
-            right_index += 1
+    def _small_lcs(self, a_lo, a_hi, b_lo, b_hi):
+        """Full LCS table with traceback; returns (removed indices, added indices), ascending."""
+        a, b = self._a, self._b
+        n, m = a_hi - a_lo, b_hi - b_lo
+        table = [[0] * (m + 1) for _ in range(n + 1)]
+        for i in range(n - 1, -1, -1):
+            row, below = table[i], table[i + 1]
+            ai = a[a_lo + i]
+            for j in range(m - 1, -1, -1):
+                if ai == b[b_lo + j]:
+                    row[j] = below[j + 1] + 1
+                else:
+                    row[j] = max(below[j], row[j + 1])
 
-        return added, removed
+        removed, added = [], []
+        i = j = 0
+        while i < n and j < m:
+            if a[a_lo + i] == b[b_lo + j]:
+                i += 1
+                j += 1
+            elif table[i + 1][j] >= table[i][j + 1]:
+                removed.append(a_lo + i)
+                i += 1
+            else:
+                added.append(b_lo + j)
+                j += 1
+        removed.extend(range(a_lo + i, a_hi))
+        added.extend(range(b_lo + j, b_hi))
+        return removed, added
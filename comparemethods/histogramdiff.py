@@ -0,0 +1,72 @@
+from comparemethods.linearmyersdiff import LinearMyersDiff
+from comparemethods.segments import diff_segments
+
+
+class HistogramDiff:
+    """Histogram diff (the patience-diff variant used by git).
+
+    Counts how often each word occurs in the left range, anchors on the
+    longest common region around the rarest words, then recurses on the
+    parts before and after it. Frequent words ("the", "§", table numbers)
+    never become anchors, which keeps the diff fast and readable. Ranges
+    without any usable anchor fall back to LinearMyersDiff."""
+    accepts_token_ids = True
+    # Words occurring more often than this in a range are never used as anchors
+    MAX_CHAIN = 64
+
+    def __init__(self, left_words, right_words):
+        self.left_words = left_words
+        self.right_words = right_words
+
+    def get_diff_as_string(self):
+        return diff_segments(self.left_words, self.right_words, self._split)
+
+    def _split(self, a_lo, a_hi, b_lo, b_hi):
+        region = self._find_anchor(a_lo, a_hi, b_lo, b_hi)
+        if region is None:
+            a, b = self.left_words, self.right_words
+            run_added, run_removed = LinearMyersDiff(a[a_lo:a_hi], b[b_lo:b_hi]).get_diff_as_string()
+            return [], [a_lo + i for i, _ in run_removed], [b_lo + j for j, _ in run_added]
+        a_start, a_end, b_start, b_end = region
+        return [(a_lo, a_start, b_lo, b_start), (a_end, a_hi, b_end, b_hi)], (), ()
+
+    def _find_anchor(self, a_lo, a_hi, b_lo, b_hi):
+        """Return the common region (a_start, a_end, b_start, b_end) built on the rarest words, or None."""
+        a, b = self.left_words, self.right_words
+        occurrences = {}
+        for i in range(a_lo, a_hi):
+            occurrences.setdefault(a[i], []).append(i)
+
+        best = None
+        best_count = self.MAX_CHAIN + 1
+        j = b_lo
+        while j < b_hi:
+            positions = occurrences.get(b[j])
+            next_j = j + 1
+            if positions is None or len(positions) > best_count:
+                j = next_j
+                continue
+
+            region_end = a_lo
+            for i in positions:
+                if i < region_end:
+                    continue  # already covered by the region found from an earlier position
+                count = len(positions)
+                a_start, b_start = i, j
+                while a_start > a_lo and b_start > b_lo and a[a_start - 1] == b[b_start - 1]:
+                    a_start -= 1
+                    b_start -= 1
+                    count = min(count, len(occurrences[a[a_start]]))
+                a_end, b_end = i + 1, j + 1
+                while a_end < a_hi and b_end < b_hi and a[a_end] == b[b_end]:
+                    count = min(count, len(occurrences[a[a_end]]))
+                    a_end += 1
+                    b_end += 1
+                region_end = a_end
+                next_j = max(next_j, b_end)
+                if best is None or a_end - a_start > best[1] - best[0] or count < best_count:
+                    best = (a_start, a_end, b_start, b_end)
+                    best_count = count
+            j = next_j
+
+        return best
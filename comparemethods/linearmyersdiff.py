@@ -0,0 +1,71 @@
+from comparemethods.segments import diff_segments
+
+
+class LinearMyersDiff:
+    """Myers diff in linear space (divide-and-conquer on the middle snake).
+
+    Unlike MyersDiff this does not keep a copy of the V array per edit step,
+    so memory stays O(N+M) no matter how many edits there are."""
+    accepts_token_ids = True
+
+    def __init__(self, left_words, right_words):
+        self.left_words = left_words
+        self.right_words = right_words
+
+    def get_diff_as_string(self):
+        a, b = self.left_words, self.right_words
+        size = 2 * (len(a) + len(b)) + 3
+        self._vf = [0] * size
+        self._vb = [0] * size
+        added, removed = diff_segments(a, b, self._split)
+        self._vf = self._vb = None
+        return added, removed
+
+    def _split(self, a_lo, a_hi, b_lo, b_hi):
+        x_start, y_start, x_end, y_end = self._middle_snake(a_lo, a_hi, b_lo, b_hi)
+        return [(a_lo, x_start, b_lo, y_start), (x_end, a_hi, y_end, b_hi)], (), ()
+
+    def _middle_snake(self, a_lo, a_hi, b_lo, b_hi):
+        """Return the middle snake (x_start, y_start, x_end, y_end) in absolute indices."""
+        a, b = self.left_words, self.right_words
+        vf, vb = self._vf, self._vb
+        n, m = a_hi - a_lo, b_hi - b_lo
+        delta = n - m
+        odd = delta & 1
+        offset = n + m + 1
+        vf[offset + 1] = 0
+        vb[offset + 1] = 0
+
+        for d in range((n + m + 1) // 2 + 1):
+            # Forward pass from the top-left corner
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                    x = vf[offset + k + 1]
+                else:
+                    x = vf[offset + k - 1] + 1
+                y = x - k
+                x0, y0 = x, y
+                while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                    x += 1
+                    y += 1
+                vf[offset + k] = x
+                if odd and delta - d < k < delta + d and x + vb[offset + delta - k] >= n:
+                    return a_lo + x0, b_lo + y0, a_lo + x, b_lo + y
+
+            # Backward pass from the bottom-right corner, in reversed coordinates
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and vb[offset + k - 1] < vb[offset + k + 1]):
+                    x = vb[offset + k + 1]
+                else:
+                    x = vb[offset + k - 1] + 1
+                y = x - k
+                x0, y0 = x, y
+                while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                    x += 1
+                    y += 1
+                vb[offset + k] = x
+                if not odd and -d <= delta - k <= d and x + vf[offset + delta - k] >= n:
+                    return a_hi - x, b_hi - y, a_hi - x0, b_hi - y0
+
+        # Unreachable for non-empty inputs: the two passes always meet
+        raise RuntimeError("middle snake not found")
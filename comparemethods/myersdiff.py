@@ -1,4 +1,6 @@
 class MyersDiff:
+    accepts_token_ids = True
+
     def __init__(self, a=None, b=None):
         self.a = a or []
         self.b = b or []
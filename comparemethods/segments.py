@@ -0,0 +1,37 @@
+"""Segment loop shared by the divide-and-conquer engines (linear Myers, histogram, Hirschberg)."""
+
+
+def diff_segments(a, b, split, words=None):
+    """Diff a against b one segment (a_lo, a_hi, b_lo, b_hi) at a time; returns (added, removed).
+
+    Each segment loses its common prefix and suffix first, and one with an
+    empty side is all added or all removed. Any other segment goes to
+    split(a_lo, a_hi, b_lo, b_hi), which returns (segments, removed, added):
+    smaller segments to diff in its place, in left-to-right order, or the
+    indices it settled itself. Segments are handled left to right, so both
+    results come out sorted as (index, word) pairs. Words are taken from
+    words=(left, right) when a and b are stand-ins for them, e.g. small ids."""
+    left, right = words or (a, b)
+    added, removed = [], []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+
+        # Trim common prefix and suffix
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+
+        if a_lo == a_hi or b_lo == b_hi:
+            removed.extend((i, left[i]) for i in range(a_lo, a_hi))
+            added.extend((j, right[j]) for j in range(b_lo, b_hi))
+            continue
+
+        segments, run_removed, run_added = split(a_lo, a_hi, b_lo, b_hi)
+        removed.extend((i, left[i]) for i in run_removed)
+        added.extend((j, right[j]) for j in run_added)
+        stack.extend(reversed(segments))
+    return added, removed
@@ -1,6 +1,8 @@
 from difflib import SequenceMatcher
 
 class SequenceMatcherCompare:
+    accepts_token_ids = True
+
     def __init__(self, left_words, right_words):
         self.left_words = left_words
         self.right_words = right_words
@@ -0,0 +1,45 @@
+import argparse
+import signal
+import sys
+import threading
+
+from src.compareservice import CompareService, make_server
+from src.extractioncache import ExtractionCache
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a local comparison service: POST /compare, GET or DELETE /jobs/<id>, GET /health. "
+                    "It reads any path it is given, so only bind it to localhost or a private socket.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port; 0 picks a free one")
+    parser.add_argument("--socket", metavar="PATH", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, help="jobs compared in parallel (default: up to 4)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="jobs that may wait; further jobs are refused with 503 until there is room")
+    parser.add_argument("--cache-dir", help="on-disk extraction cache directory (default: the user cache directory)")
+    parser.add_argument("--no-disk-cache", action="store_true", help="only cache extracted documents in memory")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = None if args.no_disk_cache else ExtractionCache(args.cache_dir)
+    service = CompareService(args.workers, args.queue_size, cache)
+    server = make_server(service, args.host, args.port, args.socket)
+    address = args.socket or "http://{}:{}".format(*server.server_address[:2])
+    print(f"Listening on {address}", flush=True)
+    # serve_forever() returns once shutdown() is called from another thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
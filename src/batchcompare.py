@@ -0,0 +1,107 @@
+"""Headless comparison of PDF pairs.
+
+The CLI runs compare_pair() in worker processes that may have no display,
+so this module and what it imports must not import Qt."""
+import json
+import time
+
+from src.pdfworker import PDFWorker, CompareCancelled
+from src.extractioncache import ExtractionCache
+from comparemethods import engines
+
+# Exit codes, per pair and for the whole run (the highest one wins)
+EXIT_SAME = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+
+def differences_to_json(differences):
+    """Turn PDFWorker._differences tuples into JSON-friendly dicts.
+
+    "moved" differences also get the page and bbox they were moved from."""
+    records = []
+    for difference in differences:
+        page, bbox, text, change_type = difference
+        record = {"page": page, "bbox": [float(v) for v in bbox], "text": text, "change_type": change_type}
+        if change_type == "moved":
+            record["source_page"] = difference.source_page
+            record["source_bbox"] = [float(v) for v in difference.source_bbox]
+        records.append(record)
+    return records
+
+
+def compare_pair(left, right, method=None, cache_dir=None, memory_limit_mb=None):
+    """Compare one pair of PDFs and return a result record (never raises).
+
+    With memory_limit_mb the pair is compared out-of-core (see src.outofcore)."""
+    worker = PDFWorker(extract_workers=1, cache=ExtractionCache(cache_dir) if cache_dir else None)
+    if memory_limit_mb:
+        worker.out_of_core = True
+        worker.memory_limit_mb = memory_limit_mb
+    try:
+        return run_pair(worker, left, right, method)
+    finally:
+        worker.close()
+
+
+def run_pair(worker, left, right, method=None, progress=None):
+    """Compare one pair on an existing PDFWorker and return a result record (never raises).
+
+    The worker keeps both documents loaded afterwards, so its caches stay warm
+    for the next pair."""
+    method = method or engines.DEFAULT
+    record = {"left": left, "right": right, "method": method}
+    timings = {}
+    start = time.perf_counter()
+    try:
+        worker.select_compare_method(method)
+
+        t = time.perf_counter()
+        worker.LoadPDF_Left(left)
+        timings["load_left"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        worker.LoadPDF_Right(right)
+        timings["load_right"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        worker.compare_pdf(progress)
+        timings["compare"] = time.perf_counter() - t
+
+        differences = differences_to_json(worker._differences)
+        record["status"] = "ok"
+        record["exit_code"] = EXIT_DIFFERENT if differences else EXIT_SAME
+        record["differences"] = differences
+        record["metrics"] = worker.metrics_report()
+    except CompareCancelled:
+        record["status"] = "cancelled"
+        record["exit_code"] = EXIT_ERROR
+    except Exception as e:
+        record["status"] = "error"
+        record["exit_code"] = EXIT_ERROR
+        record["error"] = f"{type(e).__name__}: {e}"
+    timings["total"] = time.perf_counter() - start
+    record["timing"] = timings
+    return record
+
+
+def read_manifest(path):
+    """Read (left, right) pairs from a manifest file.
+
+    Each non-empty line is either a JSON object with "left" and "right"
+    keys or two paths separated by a tab. Lines starting with # are skipped."""
+    pairs = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                pairs.append((entry["left"], entry["right"]))
+                continue
+            parts = line.split("\t")
+            if len(parts) != 2:
+                raise ValueError(f"{path}:{line_no}: expected 'left<TAB>right' or a JSON object")
+            pairs.append((parts[0], parts[1]))
+    return pairs
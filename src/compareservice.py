@@ -0,0 +1,275 @@
+"""Long-lived local comparison service.
+
+A CompareService keeps a fixed pool of worker threads, each with its own
+PDFWorker, fed from a bounded job queue. All workers share one
+DocumentRegistry (open fitz handles), one in-memory word cache and one
+on-disk ExtractionCache, so a file that any job has seen is not opened or
+extracted again. PyMuPDF is not thread-safe, so every use of it (loading,
+and the in-process part of a visual diff) holds the registry's lock; the
+word diff itself needs no document and runs in parallel. When the queue is
+full, new jobs are refused instead of piling up.
+
+make_server() puts a small JSON-over-HTTP API in front of it, on a local
+TCP port or a Unix socket:
+
+    POST   /compare    {"left": path, "right": path, "method": "myers", "visual_diff": false, "wait": false}
+                       -> 202 {"id", "status"}; 200 with the result if "wait"; 503 when the queue is full
+    GET    /jobs/<id>  -> the job: status queued | running | ok | error | cancelled, plus the
+                          batchcompare result record (differences, timing, metrics) once done
+    DELETE /jobs/<id>  -> cancel a queued job, or ask a running one to stop at its next stage
+    GET    /health     -> queue length, running jobs, open documents, cached documents
+"""
+import json
+import os
+import queue
+import socketserver
+import stat
+import threading
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.batchcompare import run_pair
+from src.documentregistry import DocumentRegistry
+from src.pdfworker import PDFWorker, CompareCancelled
+from comparemethods import engines
+
+# Finished jobs kept for GET /jobs/<id>; older ones are forgotten
+JOB_HISTORY = 256
+# Extracted documents kept in memory, shared by all workers
+WORD_CACHE_SIZE = 32
+# Seconds a client is asked to wait before retrying a refused job
+RETRY_AFTER = 1
+# Largest request body accepted, in bytes
+MAX_BODY = 1024 * 1024
+
+FINISHED = ("ok", "error", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised by CompareService.submit() when the job queue is full."""
+    pass
+
+
+class CompareJob:
+    def __init__(self, left, right, method=None, visual_diff=False):
+        self.id = uuid.uuid4().hex
+        self.left, self.right = left, right
+        self.method = method or engines.DEFAULT
+        self.visual_diff = visual_diff
+        self.status = "queued"
+        self.record = None  # batchcompare result record once finished
+        self.cancel_requested = False
+        self.done = threading.Event()
+
+    def as_dict(self):
+        job = {"id": self.id, "status": self.status, "left": self.left, "right": self.right,
+               "method": self.method, "visual_diff": self.visual_diff}
+        if self.record is not None:
+            job.update((k, v) for k, v in self.record.items() if k not in job)
+        return job
+
+
+class CompareService:
+    """Runs compare jobs on `workers` threads, with at most `queue_size` jobs waiting."""
+
+    def __init__(self, workers=None, queue_size=64, cache=None, word_cache_size=WORD_CACHE_SIZE):
+        self.registry = DocumentRegistry()
+        self.cache = cache  # optional ExtractionCache shared by all workers
+        self.word_cache = OrderedDict()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()  # id -> CompareJob, oldest first
+        self._jobs_lock = threading.Lock()
+        self._running = 0
+        self._closed = False
+        self._threads = []
+        for n in range(workers or min(4, os.cpu_count() or 1)):
+            worker = PDFWorker(registry=self.registry, cache=self.cache)
+            worker._word_cache = self.word_cache  # only touched while loading, under registry.lock
+            worker.WORD_CACHE_SIZE = word_cache_size
+            thread = threading.Thread(target=self._run, args=(worker,), name=f"compare-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, left, right, method=None, visual_diff=False):
+        """Queue a job and return it; raises QueueFull instead of waiting for room."""
+        if method:
+            engines.load(method)  # ValueError or EngineUnavailable now, rather than a failed job later
+        job = CompareJob(left, right, method, visual_diff)
+        with self._jobs_lock:
+            if self._closed:
+                raise QueueFull("the service is shutting down")
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self._queue.maxsize} jobs are already waiting") from None
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        return job
+
+    def job(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; a running one stops at its next progress report. Returns the job or None."""
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested = True
+            if job.status != "queued":
+                return job
+            job.status = "cancelled"  # the worker that dequeues it skips it
+        job.done.set()
+        return job
+
+    def health(self):
+        with self._jobs_lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {"status": "ok", "workers": len(self._threads), "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize, "running": self._running,
+                "finished": sum(status in FINISHED for status in statuses),
+                "open_documents": len(self.registry), "cached_documents": len(self.word_cache)}
+
+    def close(self):
+        """Cancel the queued jobs, let running ones finish, stop the workers and release their documents."""
+        with self._jobs_lock:
+            self._closed = True  # submit() puts nothing after this
+        # Drain first: put() would block on a full queue, and workers would run every job ahead of their sentinel
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.cancel(job.id)
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def _run(self, worker):
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                with self._jobs_lock:
+                    if job.status != "queued":
+                        continue
+                    job.status = "running"
+                    self._running += 1
+
+                def progress(percent, stage):
+                    if job.cancel_requested:
+                        raise CompareCancelled()
+
+                worker.visual_diff = job.visual_diff
+                record = run_pair(worker, job.left, job.right, job.method, progress)
+                with self._jobs_lock:
+                    self._running -= 1
+                self._finish(job, record["status"], record)
+        finally:
+            worker.close()
+
+    def _finish(self, job, status, record):
+        with self._jobs_lock:
+            job.record = record
+            job.status = status
+        job.done.set()
+
+
+class CompareRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of a CompareService (see the module docstring); self.server.service is the service."""
+    server_version = "PDFComparator"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            return self._reply(HTTPStatus.OK, service.health())
+        job = self._job()
+        if job is not None:
+            self._reply(HTTPStatus.OK, job.as_dict())
+
+    def do_DELETE(self):
+        job = self._job()
+        if job is not None:
+            self.server.service.cancel(job.id)
+            self._reply(HTTPStatus.OK, job.as_dict())
+
+    def do_POST(self):
+        if self.path != "/compare":
+            return self._reply(HTTPStatus.NOT_FOUND, {"error": f"no such endpoint: {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError("negative Content-Length")
+            if length > MAX_BODY:
+                return self._reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"})
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict) or not isinstance(body.get("left"), str) \
+                    or not isinstance(body.get("right"), str):
+                raise ValueError('expected {"left": path, "right": path}')
+            job = self.server.service.submit(body["left"], body["right"], body.get("method"),
+                                             bool(body.get("visual_diff")))
+        except QueueFull as e:
+            return self._reply(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER)})
+        except (ValueError, engines.EngineUnavailable) as e:  # includes malformed JSON
+            return self._reply(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        if body.get("wait"):
+            job.done.wait()
+            return self._reply(HTTPStatus.OK, job.as_dict())
+        self._reply(HTTPStatus.ACCEPTED, {"id": job.id, "status": job.status}, {"Location": f"/jobs/{job.id}"})
+
+    def _job(self):
+        """The job named by a /jobs/<id> path; replies 404 and returns None otherwise."""
+        prefix, _, job_id = self.path.rpartition("/")
+        job = self.server.service.job(job_id) if prefix == "/jobs" else None
+        if job is None:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"no such job or endpoint: {self.path}"})
+        return job
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.unlink(self.server_address)
+            except OSError:
+                pass
+
+
+def make_server(service, host="127.0.0.1", port=8765, socket_path=None):
+    """HTTP server for the service on host:port (port 0 picks a free one), or on a Unix socket."""
+    if socket_path:
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)  # left over from a previous run
+        server = UnixHTTPServer(socket_path, CompareRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), CompareRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
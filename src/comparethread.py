@@ -0,0 +1,39 @@
+from PySide6.QtCore import QThread, Signal
+
+from src.pdfworker import CompareCancelled
+
+
+class CompareThread(QThread):
+    """Runs PDFWorker.iter_compare off the GUI thread.
+
+    Each finished region is emitted through `chunk_ready` (differences, added,
+    removed) as soon as it is grouped, in page order; `result_ready` follows
+    with the full list. Progress is reported per stage through `progress`.
+    Call requestInterruption() to cancel; the run stops at its next progress
+    report and emits `cancelled`."""
+    progress = Signal(int, str)
+    chunk_ready = Signal(list, list, list)
+    result_ready = Signal(list)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, pdfworker, parent=None):
+        super().__init__(parent)
+        self.pdfworker = pdfworker
+
+    def run(self):
+        try:
+            for differences, added, removed in self.pdfworker.iter_compare(progress=self._on_progress):
+                self.chunk_ready.emit(differences, added, removed)
+        except CompareCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.result_ready.emit(self.pdfworker._differences)
+
+    def _on_progress(self, percent, stage):
+        if self.isInterruptionRequested():
+            raise CompareCancelled()
+        self.progress.emit(percent, stage)
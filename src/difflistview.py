@@ -0,0 +1,196 @@
+import bisect
+
+from PySide6.QtWidgets import QStyledItemDelegate, QStyle
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPen
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize
+
+
+class DiffListModel(QAbstractListModel):
+    """Flat list model over PDFWorker differences, grouped by page.
+
+    Every page with changes gets a header row followed by one row per
+    difference on that page. Rows only hold indices into the differences
+    list, so the model costs a few bytes per difference and the view only
+    asks for the rows it paints."""
+    KindRole = Qt.UserRole + 1        # "page" for headers, "diff" for changes
+    PageRole = Qt.UserRole + 2
+    BBoxRole = Qt.UserRole + 3
+    ChangeTypeRole = Qt.UserRole + 4
+    DiffIndexRole = Qt.UserRole + 5   # index into the differences list, None for headers
+
+    # Longer texts are cut in the list, like the old diff cards did
+    MAX_TEXT = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._differences = []
+        # (page, diff index or None for a header); sorted by page, then diff index, headers first
+        self._rows = []
+
+    def set_differences(self, differences):
+        self.beginResetModel()
+        self._differences = list(differences)
+        self._rows = []
+        order = sorted(range(len(differences)), key=lambda i: differences[i][0])
+        page = None
+        for i in order:
+            if differences[i][0] != page:
+                page = differences[i][0]
+                self._rows.append((page, None))
+            self._rows.append((page, i))
+        self.endResetModel()
+
+    def add_differences(self, differences):
+        """Append differences (e.g. one streamed region) without resetting the view.
+
+        Their indices continue after the existing ones; each page's rows are
+        inserted at the end of that page's section, or as a new section."""
+        first = len(self._differences)
+        self._differences.extend(differences)
+        by_page = {}
+        for i, diff in enumerate(differences, first):
+            by_page.setdefault(diff[0], []).append(i)
+
+        for page in sorted(by_page):
+            new_rows = [(page, i) for i in by_page[page]]
+            # Headers are in page order: find this page's section, or where it belongs
+            row = bisect.bisect_left(self._rows, (page, -1), key=self._sort_key)
+            if row == len(self._rows) or self._rows[row] != (page, None):
+                new_rows.insert(0, (page, None))
+            else:
+                row = bisect.bisect_left(self._rows, (page + 1, -1), key=self._sort_key)  # end of the section
+            self.beginInsertRows(QModelIndex(), row, row + len(new_rows) - 1)
+            self._rows[row:row] = new_rows
+            self.endInsertRows()
+
+    @staticmethod
+    def _sort_key(row):
+        page, diff_index = row
+        return page, -1 if diff_index is None else diff_index
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self._rows[index.row()][1] is None:
+            return Qt.ItemIsEnabled  # page headers can't be selected
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        page, diff_index = self._rows[index.row()]
+        if role == self.KindRole:
+            return "page" if diff_index is None else "diff"
+        if role == self.PageRole:
+            return page
+        if role == self.DiffIndexRole:
+            return diff_index
+        if diff_index is None:
+            return f"Page {page + 1}" if role == Qt.DisplayRole else None
+
+        _, bbox, text, change_type = self._differences[diff_index]
+        if role == Qt.DisplayRole:
+            return text[:self.MAX_TEXT] + ("..." if len(text) > self.MAX_TEXT else "")
+        if role == self.BBoxRole:
+            return bbox
+        if role == self.ChangeTypeRole:
+            return change_type
+        return None
+
+    def row_of(self, diff_index):
+        """Row showing the given difference, or None."""
+        if not 0 <= diff_index < len(self._differences):
+            return None
+        # New differences only ever get higher indices, so rows stay sorted and can be bisected
+        row = bisect.bisect_left(self._rows, (self._differences[diff_index][0], diff_index), key=self._sort_key)
+        return row if row < len(self._rows) and self._rows[row][1] == diff_index else None
+
+    def diff_rows(self):
+        """Rows that hold a difference (not a page header), in display order."""
+        return [row for row, (_, diff_index) in enumerate(self._rows) if diff_index is not None]
+
+
+class DiffCardDelegate(QStyledItemDelegate):
+    """Paints page headers and diff cards directly; no widgets or stylesheets per row."""
+    CARD_WIDTH = 260
+    MARGIN = 6
+    PADDING = 4
+    # (background, border) per change type; anything else uses the "removed" colors
+    COLORS = {
+        "added": (QColor("#e6ffe6"), QColor("#00cc00")),
+        "removed": (QColor("#ffe6e6"), QColor("#cc0000")),
+        "moved": (QColor("#e6efff"), QColor("#3366cc")),
+    }
+    HEADER_BACKGROUND = QColor("#f7f7f7")
+    HEADER_BORDER = QColor("#cccccc")
+    SELECTED_BORDER = QColor("#4499ff")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.header_font = QFont()
+        self.header_font.setBold(True)
+        self.header_font.setPointSizeF(self.header_font.pointSizeF() * 1.1)
+        self.title_font = QFont()
+        self.title_font.setBold(True)
+
+    def _text_rect(self, option):
+        """Area of the card body text, for a card drawn in option.rect."""
+        width = min(self.CARD_WIDTH, max(1, self._available_width(option) - 2 * self.MARGIN))
+        inner = width - 2 * self.PADDING
+        title_h = QFontMetrics(self.title_font).height()
+        return QRect(option.rect.x() + self.MARGIN + self.PADDING,
+                     option.rect.y() + self.MARGIN // 2 + self.PADDING + title_h,
+                     inner, 0)
+
+    @staticmethod
+    def _available_width(option):
+        view = option.widget
+        return view.viewport().width() if view is not None else option.rect.width()
+
+    def sizeHint(self, option, index):
+        width = self._available_width(option)
+        if index.data(DiffListModel.KindRole) == "page":
+            return QSize(width, QFontMetrics(self.header_font).height() + 2 * self.MARGIN)
+        text_rect = self._text_rect(option)
+        text_h = option.fontMetrics.boundingRect(QRect(0, 0, text_rect.width(), 100000),
+                                                 Qt.TextWordWrap, index.data(Qt.DisplayRole)).height()
+        title_h = QFontMetrics(self.title_font).height()
+        return QSize(width, title_h + text_h + 2 * self.PADDING + self.MARGIN)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        if index.data(DiffListModel.KindRole) == "page":
+            band = rect.adjusted(1, self.MARGIN // 2, -1, -1)
+            painter.setPen(QPen(self.HEADER_BORDER))
+            painter.setBrush(self.HEADER_BACKGROUND)
+            painter.drawRect(band)
+            painter.setFont(self.header_font)
+            painter.setPen(option.palette.color(option.palette.ColorRole.Text))
+            painter.drawText(band.adjusted(self.MARGIN, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter,
+                             index.data(Qt.DisplayRole))
+            painter.restore()
+            return
+
+        change_type = index.data(DiffListModel.ChangeTypeRole)
+        background, border = self.COLORS.get(change_type, self.COLORS["removed"])
+        text_rect = self._text_rect(option)
+        card = QRect(rect.x() + self.MARGIN, rect.y() + self.MARGIN // 2,
+                     text_rect.width() + 2 * self.PADDING, rect.height() - self.MARGIN)
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(QPen(self.SELECTED_BORDER if selected else border, 2 if selected else 1))
+        painter.setBrush(background)
+        painter.drawRoundedRect(card, 5, 5)
+
+        painter.setPen(option.palette.color(option.palette.ColorRole.Text))
+        painter.setFont(self.title_font)
+        painter.drawText(card.adjusted(self.PADDING, self.PADDING, -self.PADDING, 0), Qt.AlignLeft | Qt.AlignTop,
+                         (change_type or "").capitalize())
+        painter.setFont(option.font)
+        text_rect.setBottom(card.bottom() - self.PADDING)
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, index.data(Qt.DisplayRole))
+        painter.restore()
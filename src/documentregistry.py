@@ -0,0 +1,48 @@
+import os
+import threading
+
+import pymupdf as fitz
+
+
+class DocumentRegistry:
+    """Keeps one opened fitz.Document per file and shares it between components.
+
+    Documents are reference counted: every acquire() must be paired with a
+    release(), and the document is closed once nobody holds it anymore.
+    A file that changed on disk (size or mtime) is opened again.
+
+    MuPDF is not thread-safe, not even across separate documents, so threads
+    sharing a registry hold `lock` around everything they do with fitz."""
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._entries = {}  # key -> [document, refcount]
+
+    @staticmethod
+    def key(path):
+        """Identity of a file's current contents: (absolute path, size, mtime)."""
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    def acquire(self, path):
+        key = self.key(path)
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [fitz.open(path), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, document):
+        if document is None:
+            return
+        with self.lock:
+            for key, entry in self._entries.items():
+                if entry[0] is document:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self._entries[key]
+                        document.close()
+                    return
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import pymupdf as fitz
+import numpy as np
+
+from src.wordtable import WordTable
+
+
+class ExtractionCache:
+    """On-disk cache of extracted WordTables.
+
+    Entries are keyed by the SHA-256 of the PDF bytes plus the extraction
+    parameters, so a renamed or copied file still hits. Each entry is a
+    directory holding the columns as .npy files (loaded memory-mapped) and
+    the vocabulary as UTF-8 text. When the total size exceeds max_bytes the
+    least recently used entries are deleted."""
+    # Bump when the on-disk layout or chars_to_words output changes
+    FORMAT_VERSION = 1
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+    COLUMNS = ("token_ids", "bbox", "page_num")
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(path, chunk_size=1024 * 1024):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def key(self, path, **params):
+        """Cache key for a file and the extraction parameters used on it."""
+        params = dict(params, format=self.FORMAT_VERSION, mupdf=fitz.VersionBind)
+        param_str = ",".join(f"{k}={params[k]!r}" for k in sorted(params))
+        param_hash = hashlib.sha256(param_str.encode()).hexdigest()[:16]
+        return f"{self.file_hash(path)}-{param_hash}"
+
+    def get(self, key):
+        """Return the cached WordTable for key, or None."""
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            columns = {name: np.load(os.path.join(entry, name + ".npy"), mmap_mode="r")
+                       for name in self.COLUMNS}
+            with open(os.path.join(entry, "vocab.txt"), encoding="utf-8", errors="surrogatepass") as f:
+                text = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(entry)  # mark as recently used
+        # Words never contain whitespace, so newlines are a safe separator
+        vocab = text.split("\n") if text else []
+        return WordTable(vocab, columns["token_ids"], columns["bbox"], columns["page_num"])
+
+    def put(self, key, words):
+        entry = os.path.join(self.cache_dir, key)
+        # Write into a temp dir first so readers never see a half-written entry
+        tmp = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            for name in self.COLUMNS:
+                np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(words, name)))
+            with open(os.path.join(tmp, "vocab.txt"), "w", encoding="utf-8", errors="surrogatepass") as f:
+                f.write("\n".join(words.vocab))
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict(keep=entry)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes.
+
+        The entry at path `keep` (usually the one just written) is never deleted."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+            entries.append((os.stat(path).st_mtime, size, path))
+            total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+def default_cache_dir():
+    """$PDF_COMPARATOR_CACHE_DIR, else the user's cache directory."""
+    path = os.environ.get("PDF_COMPARATOR_CACHE_DIR")
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-comparator", "extraction")
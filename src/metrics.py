@@ -0,0 +1,125 @@
+"""Stage timers, counters and opt-in profiling for loads and comparisons.
+
+Profiling is switched on from the environment, without code changes:
+
+    PDF_COMPARATOR_PROFILE=cprofile              # pstats dump per load/compare
+    PDF_COMPARATOR_PROFILE=tracemalloc           # top allocation sites per load/compare
+    PDF_COMPARATOR_PROFILE=cprofile,tracemalloc
+    PDF_COMPARATOR_PROFILE_DIR=/tmp/profiles     # where the files go (default: current directory)
+"""
+import cProfile
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_ENV = "PDF_COMPARATOR_PROFILE"
+PROFILE_DIR_ENV = "PDF_COMPARATOR_PROFILE_DIR"
+# Allocation sites listed in a tracemalloc report
+TRACEMALLOC_TOP = 30
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb():
+    """Resident memory of this process right now, in MB (peak_rss_mb() where that is unknown)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+class Metrics:
+    """Wall time per stage and named counters of one load or comparison.
+
+    A stage entered several times (e.g. the engine once per region) adds up."""
+
+    def __init__(self):
+        self.stages = {}    # stage name -> seconds
+        self.counters = {}  # counter name -> number (or short string)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def as_dict(self):
+        return {"stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                "counters": dict(self.counters)}
+
+
+def profile_modes():
+    """The profilers asked for in PDF_COMPARATOR_PROFILE, e.g. {"cprofile", "tracemalloc"}."""
+    return {mode.strip().lower() for mode in os.environ.get(PROFILE_ENV, "").split(",") if mode.strip()}
+
+
+@contextmanager
+def profiling(label):
+    """Capture the profiles asked for in PDF_COMPARATOR_PROFILE around the block.
+
+    Writes <label>-<time>.prof (cProfile, open with pstats or snakeviz) and/or
+    <label>-<time>.tracemalloc.txt into PDF_COMPARATOR_PROFILE_DIR. Does
+    nothing when the variable is unset."""
+    modes = profile_modes()
+    profiler = None
+    if "cprofile" in modes:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active in this process
+            profiler = None
+    started_tracing = "tracemalloc" in modes and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if modes:
+            _write_profiles(label, profiler, started_tracing)
+
+
+def _write_profiles(label, profiler, started_tracing):
+    directory = os.environ.get(PROFILE_DIR_ENV) or os.getcwd()
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(base + ".prof")
+    if started_tracing:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(base + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"current {current / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB\n")
+            for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
@@ -0,0 +1,118 @@
+"""Detect blocks of words that were moved rather than removed and re-added.
+
+Every engine reports a relocated section twice: removed where it was and
+added where it is now. find_moves() hashes word n-grams of the removed and
+added runs with a rolling hash and pairs up identical blocks in close to
+linear time; moved_differences() turns them into "moved" differences."""
+import pymupdf as fitz
+import numpy as np
+
+# Blocks shorter than this many words are never reported as moved
+MIN_WORDS = 8
+
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+class MovedBlock(tuple):
+    """A (page, bbox, text, "moved") difference at the block's new place on the right,
+    which also knows where the block came from on the left (source_page, source_bbox)."""
+
+    def __new__(cls, page, bbox, text, source_page, source_bbox):
+        block = super().__new__(cls, (page, bbox, text, "moved"))
+        block.source_page = source_page
+        block.source_bbox = source_bbox
+        return block
+
+    def __reduce__(self):
+        page, bbox, text, _ = self
+        return MovedBlock, (page, bbox, text, self.source_page, self.source_bbox)
+
+
+def _runs(indices):
+    """Split sorted word indices into (start, stop) runs of consecutive indices."""
+    runs = []
+    for idx in indices:
+        if runs and runs[-1][1] == idx:
+            runs[-1][1] = idx + 1
+        else:
+            runs.append([idx, idx + 1])
+    return runs
+
+
+def _windows(ids, runs, n):
+    """Yield (start, hash) of every n-word window that lies inside one run."""
+    top = pow(_BASE, n - 1, _MOD)
+    for start, stop in runs:
+        if stop - start < n:
+            continue
+        h = 0
+        for k in range(start, start + n):
+            h = (h * _BASE + ids[k] + 1) % _MOD
+        yield start, h
+        for k in range(start + 1, stop - n + 1):
+            h = ((h - (ids[k - 1] + 1) * top) * _BASE + ids[k + n - 1] + 1) % _MOD
+            yield k, h
+
+
+def find_moves(left_ids, right_ids, removed, added, min_words=MIN_WORDS):
+    """Pair up identical blocks of removed (left) and added (right) words.
+
+    removed and added are sorted word indices; left_ids and right_ids map
+    word indices to shared token ids (lists, or dicts that hold at least
+    the removed and added words). Returns (left start, right start,
+    length) per block, at least min_words long, in right-side order. Every
+    word belongs to at most one block."""
+    if min_words < 1 or not removed or not added:
+        return []
+    removed_set = set(removed)
+    by_hash = {}
+    for start, h in _windows(left_ids, _runs(removed), min_words):
+        by_hash.setdefault(h, []).append(start)
+
+    used_left = set()
+    blocks = []
+    for start, stop in _runs(added):
+        j = start
+        windows = dict(_windows(right_ids, [(start, stop)], min_words))
+        while j <= stop - min_words:
+            match = None
+            for i in by_hash.get(windows[j], ()):
+                if (i not in used_left and i + min_words - 1 not in used_left
+                        and all(left_ids[i + k] == right_ids[j + k] for k in range(min_words))):
+                    match = i
+                    break
+            if match is None:
+                j += 1
+                continue
+            # Grow the block as long as both sides keep matching
+            length = min_words
+            while (match + length in removed_set and match + length not in used_left
+                   and j + length < stop and left_ids[match + length] == right_ids[j + length]):
+                length += 1
+            used_left.update(range(match, match + length))
+            blocks.append((match, j, length))
+            j += length
+    return blocks
+
+
+def _union(bbox):
+    return fitz.Rect(bbox[:, 0].min(), bbox[:, 1].min(), bbox[:, 2].max(), bbox[:, 3].max())
+
+
+def moved_differences(words_left, words_right, blocks):
+    """One MovedBlock per block and pair of pages; blocks that cross a page break are split there."""
+    differences = []
+    for l_start, r_start, length in blocks:
+        left_pages = words_left.page_num[l_start:l_start + length]
+        right_pages = words_right.page_num[r_start:r_start + length]
+        # Cut wherever either side moves on to a new page
+        cuts = np.flatnonzero((np.diff(left_pages) != 0) | (np.diff(right_pages) != 0)) + 1
+        bounds = [0, *cuts.tolist(), length]
+        vocab = words_right.vocab
+        for a, b in zip(bounds, bounds[1:]):
+            differences.append(MovedBlock(
+                int(right_pages[a]), _union(words_right.bbox[r_start + a:r_start + b]),
+                " ".join(vocab[t] for t in words_right.token_ids[r_start + a:r_start + b].tolist()),
+                int(left_pages[a]), _union(words_left.bbox[l_start + a:l_start + b])))
+    return differences
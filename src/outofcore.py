@@ -0,0 +1,129 @@
+"""Out-of-core word storage for documents too large to diff in memory.
+
+In out-of-core mode (PDFWorker.out_of_core) a document is extracted page
+by page straight into spill files. Token ids, bboxes and page numbers are
+appended to temporary files that are then memory-mapped as the columns of
+a SpilledWordTable. Only the vocabulary stays in RAM, and both documents
+share it, so their token ids compare directly.
+
+The compare then works in bounded windows (see PDFWorker._iter_engine_spilled).
+Identical pages are matched first by hashing their token ids. Each run of
+changed pages is then read at most `window` words per side at a time. A
+window is cut into regions at resynchronization anchors: words that occur
+exactly once on each side and sit inside a stretch of equal words (the
+same anchors PDFWorker._split_run uses). The part after the last anchor is
+read again as the start of the next window. Spill pages that have been
+diffed are dropped from memory again, and the window shrinks whenever the
+process RSS goes over the ceiling.
+
+Tradeoff: within a window the diff is what the engine would give anyway,
+and a cut at an anchor costs nothing, because any sensible alignment
+matches the anchor's stretch of equal words. When a window holds no anchor
+at all, it is cut where it ends. Changes that straddle such a forced cut
+are aligned on their own sides of the cut, so the result can contain more
+removed + added pairs than the optimal global diff. Move detection often
+pairs those up again. Text shifted by more than a window does not
+resynchronize until the next identical page or anchor. Only engines with
+linear memory (linear-myers, histogram, hirschberg) stay within the
+ceiling; MyersDiff needs memory proportional to window size times edit
+distance.
+"""
+import hashlib
+import mmap
+import tempfile
+
+import numpy as np
+
+from src.wordtable import WordTable
+
+# Rough memory one word of a window costs while it is diffed: the token id lists
+# plus the engine's own arrays (linear-space engines measure at 40-60 bytes)
+BYTES_PER_WINDOW_WORD = 256
+MIN_WINDOW = 2000
+MAX_WINDOW = 200000
+
+
+class SpillFile:
+    """Append-only temporary file that becomes a read-only memory map once finished."""
+
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._map = None
+
+    def append(self, array):
+        self._file.write(np.ascontiguousarray(array).tobytes())
+
+    def finish(self, dtype, row_shape=()):
+        """Map the file and return its contents as a read-only array of rows."""
+        self._file.flush()
+        size = self._file.tell()
+        if size == 0:
+            return np.zeros((0, *row_shape), dtype=dtype)
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        return np.frombuffer(self._map, dtype=dtype).reshape(-1, *row_shape)
+
+    def release(self, start, stop):
+        """Drop bytes [start, stop) from memory; they are read back from disk when touched again."""
+        if self._map is None or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        start -= start % mmap.PAGESIZE
+        stop = min(stop, len(self._map))
+        if stop > start:
+            self._map.madvise(mmap.MADV_DONTNEED, start, stop - start)
+
+    def close(self):
+        # Arrays may still point into the map; it is unmapped once they are gone
+        self._map = None
+        self._file.close()
+
+
+class SpilledWordTable(WordTable):
+    """WordTable whose columns are memory-mapped spill files (see spill_words)."""
+
+    def __init__(self, vocab, files, token_ids, bbox, page_num):
+        super().__init__(vocab, token_ids, bbox, page_num)
+        self._files = files  # token ids, bbox, page numbers
+
+    def release(self, start, stop):
+        """Let words [start, stop) leave memory until they are read again."""
+        for spill, itemsize in zip(self._files, (4, 32, 4)):
+            spill.release(start * itemsize, stop * itemsize)
+
+    def close(self):
+        for spill in self._files:
+            spill.close()
+
+
+def spill_words(pdf, words_of_page, vocab, index, directory=None):
+    """Extract pdf page by page into spill files and return them as a SpilledWordTable.
+
+    words_of_page(page) returns (texts, bbox array) for one fitz page. vocab
+    and index (text -> id) are extended in place; pass the same ones for both
+    documents so their ids are comparable."""
+    files = [SpillFile(directory) for _ in range(3)]
+    for page_num in range(pdf.page_count):
+        texts, bbox = words_of_page(pdf.load_page(page_num))
+        ids = np.empty(len(texts), dtype=np.int32)
+        for k, text in enumerate(texts):
+            token = index.get(text)
+            if token is None:
+                token = index[text] = len(vocab)
+                vocab.append(text)
+            ids[k] = token
+        files[0].append(ids)
+        files[1].append(np.asarray(bbox, dtype=np.float64).reshape(-1, 4))
+        files[2].append(np.full(len(texts), page_num, dtype=np.int32))
+    return SpilledWordTable(vocab, files, files[0].finish(np.int32), files[1].finish(np.float64, (4,)),
+                            files[2].finish(np.int32))
+
+
+def page_fingerprints(words, offsets):
+    """A digest of each page's token ids; equal pages get equal digests."""
+    return [hashlib.blake2b(words.token_ids[start:stop].tobytes(), digest_size=16).digest()
+            for start, stop in zip(offsets, offsets[1:])]
+
+
+def window_words(memory_limit_mb, rss_mb):
+    """Words per side a window may hold to stay under memory_limit_mb with rss_mb already in use."""
+    budget = max(0.0, memory_limit_mb - rss_mb) * 1024 * 1024
+    return int(min(MAX_WINDOW, max(MIN_WINDOW, budget / (2 * BYTES_PER_WINDOW_WORD))))
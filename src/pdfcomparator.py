@@ -1,18 +1,29 @@
 from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QScrollArea, QFileDialog, QFrame, QSizePolicy
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
+    QLabel, QPushButton, QScrollArea, QFileDialog, QListView, QCheckBox
 )
-from PySide6.QtGui import QPixmap, QPainter, QColor
+from PySide6.QtGui import QPixmap, QPainter, QColor, QKeySequence, QShortcut
 from PySide6.QtCore import Qt, QRect, Signal, QTimer, QPropertyAnimation, QEasingCurve
 
 from ui.ui_mainwindow import Ui_MainWindow  # the generated file
 from src.pdfworker import *  # your PDF comparison logic
 from src.pdfviewer import *
+from src.comparethread import CompareThread
+from src.difflistview import DiffListModel, DiffCardDelegate
+from src.documentregistry import DocumentRegistry
+from src.spatialindex import SpatialIndex
+from src.extractioncache import ExtractionCache
+from src.rasterdiff import VISUAL_CHANGE
+from src.metrics import Metrics
+from comparemethods import engines
 from collections import defaultdict
+import json
+import numpy as np
 
 
 
 class PDFComparator(QMainWindow, Ui_MainWindow):
+    MOVED_COLOR = (0.2, 0.4, 0.8)  # both ends of a moved block
     def __init__(self):
         super().__init__()
         self.setupUi(self)  # load the UI from Qt Designer
@@ -21,12 +32,24 @@ class PDFComparator(QMainWindow, Ui_MainWindow):
         self.resize(1600, 900)
         
         
-        self.left_pdf_viewer = PDFViewer()
-        self.right_pdf_viewer = PDFViewer()
+        # One registry so the viewers and the worker share each opened document
+        self.document_registry = DocumentRegistry()
+        self.left_pdf_viewer = PDFViewer(registry=self.document_registry)
+        self.right_pdf_viewer = PDFViewer(registry=self.document_registry)
         
-        self.pdfworker = PDFWorker()
+        self.pdfworker = PDFWorker(registry=self.document_registry, cache=ExtractionCache())
         
         self.compared = False
+        self.compared_key = None  # PDFWorker.result_key() of the differences on screen
+        self.compare_thread = None  # Running CompareThread, if any
+        self.cancelled_thread = None  # Cancelled CompareThread that hasn't stopped using the worker yet
+        self.restart_pending = False  # compare_pdfs was called while cancelled_thread was still running
+        self.streamed_regions = 0  # regions of the running compare already shown
+        self.view_metrics = Metrics()  # time spent showing the running compare's results
+        
+        # Where the last compare spent its time; the tooltip has every stage and counter
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
         
         # Add them into the placeholders defined in your UI
         left_layout = QVBoxLayout(self.left_viewer)
@@ -51,153 +74,132 @@ class PDFComparator(QMainWindow, Ui_MainWindow):
         self.prev_button.clicked.connect(self.prev_diff)
         self.next_button.clicked.connect(self.next_diff)      
         
+        # Zoom both pages together; Ctrl+wheel over a page zooms just that viewer
+        for keys, action in ((QKeySequence.ZoomIn, PDFViewer.zoom_in), (QKeySequence.ZoomOut, PDFViewer.zoom_out),
+                             (QKeySequence("Ctrl+0"), PDFViewer.reset_zoom)):
+            QShortcut(keys, self).activated.connect(lambda action=action: self.zoom_viewers(action))
+        
         self.differences = []  # Will hold the differences after comparison  
+        self.differences_index = SpatialIndex(np.zeros((0, 4)), [])  # grid over the difference bboxes
+        self.differences_sides = []  # (diff index, "removed" or "added" side) per differences_index entry
+        
+        # Clicking a page selects the difference (or reports the word) under the cursor
+        self.left_pdf_viewer.page_clicked.connect(
+            lambda page, x, y: self.on_page_clicked(self.pdfworker.pdfDTOLeft, "removed", page, x, y))
+        self.right_pdf_viewer.page_clicked.connect(
+            lambda page, x, y: self.on_page_clicked(self.pdfworker.pdfDTORight, "added", page, x, y))
         
         self.c_method_comboBox.currentIndexChanged.connect(self.change_compare_method)
         self.c_method_comboBox.clear()
-        self.c_method_comboBox.addItems([
-            "Myers Diff (Default)",
-            "DeepDiff",
-            "SequenceMatcher",
-            "Hirschberg",
-        ])
+        self.c_method_comboBox.addItems([engines.label(name) for name in self.pdfworker._compareMethodNames])
+        # Engines whose optional packages are missing stay listed, but can't be picked
+        for i, name in enumerate(self.pdfworker._compareMethodNames):
+            missing = engines.missing_packages(name)
+            if missing:
+                self.c_method_comboBox.model().item(i).setEnabled(False)
+                self.c_method_comboBox.setItemData(i, f"Needs {', '.join(missing)}: pip install {' '.join(missing)}",
+                                                   Qt.ToolTipRole)
         self.c_method_comboBox.setCurrentIndex(0)
         self.c_method_comboBox.setToolTip("Select comparison method")
+
+        # Opt-in raster comparison of pages with images or without text
+        self.visual_diff_checkBox = QCheckBox("Visual diff", self.centralwidget)
+        self.visual_diff_checkBox.setToolTip("Also compare images and scanned pages pixel by pixel")
+        self.visual_diff_checkBox.toggled.connect(self.change_visual_diff)
+        self.horizontalLayout_3.insertWidget(self.horizontalLayout_3.indexOf(self.pushButton_5),
+                                             self.visual_diff_checkBox)
         
-        # assuming rightScrollArea is your QScrollArea from .ui
-        self.diff_scroll = self.changes_viewer  # rename for clarity if needed
-
-        # 1️⃣ Create a QWidget to hold the layout
-        self.diff_container = QWidget()
-        self.diff_container.setObjectName("diff_container")
-
-        # 2️⃣ Create the layout that will hold all diff cards
-        self.diff_layout = QVBoxLayout(self.diff_container)
-        self.diff_layout.setAlignment(Qt.AlignTop)
-        self.diff_layout.setContentsMargins(10, 10, 10, 10)
-        self.diff_layout.setSpacing(8)
-
-        # 3️⃣ Attach the container to the scroll area
-        self.diff_scroll.setWidget(self.diff_container)
-        self.diff_scroll.setWidgetResizable(True)
+        # Diff list: a model/view list that only paints the visible rows
+        self.diff_model = DiffListModel(self)
+        self.changes_viewer.setModel(self.diff_model)
+        self.changes_viewer.setItemDelegate(DiffCardDelegate(self.changes_viewer))
+        self.changes_viewer.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.changes_viewer.setResizeMode(QListView.Adjust)  # re-wrap card texts on resize
+        self.changes_viewer.setLayoutMode(QListView.Batched)  # lay out big lists in chunks
+        self.changes_viewer.setSelectionMode(QListView.SingleSelection)
+        self.changes_viewer.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)  # cards wrap instead
+        self.changes_viewer.clicked.connect(lambda index: self.scroll_to_diff(index.data(DiffListModel.DiffIndexRole)))
         
     def change_compare_method(self, index):
-        methods = self.pdfworker._allCompareMethods
-        if 0 <= index < len(methods):
-            self.pdfworker._selectedCompareMethod = methods[index]
+        names = self.pdfworker._compareMethodNames
+        if 0 <= index < len(names):
+            try:
+                self.pdfworker.select_compare_method(names[index])  # imports the engine on first use
+            except engines.EngineUnavailable as e:
+                self.statusBar().showMessage(str(e), 5000)
+                self.pdfworker._selectedCompareMethod = None
+                self.c_method_comboBox.setCurrentIndex(0)
+                return
         else:
             self.pdfworker._selectedCompareMethod = None
+        self.refresh_compare()
+
+    def change_visual_diff(self, enabled):
+        self.pdfworker.visual_diff = enabled
+        self.refresh_compare()
 
     def load_left_pdf(self):
         path, _ = QFileDialog.getOpenFileName(self, "Open Left PDF", "", "PDF Files (*.pdf)")
         if path:
+            self.cancel_compare()
+            self.wait_for_cancelled()  # the worker's documents can't be swapped while a run reads them
             self.left_pdf_path = path
             self.left_pdf_viewer.load_pdf(path)
             self.pdfworker.LoadPDF_Left(path)
-            self.compared = False
+            self.compared_key = None  # the reloaded viewer lost its highlights
+            self.refresh_compare()
 
     def load_right_pdf(self):
         path, _ = QFileDialog.getOpenFileName(self, "Open Right PDF", "", "PDF Files (*.pdf)")
         if path:
+            self.cancel_compare()
+            self.wait_for_cancelled()  # the worker's documents can't be swapped while a run reads them
             self.right_pdf_path = path
             self.right_pdf_viewer.load_pdf(path)
             self.pdfworker.LoadPDF_Right(path)
-            self.compared = False
+            self.compared_key = None  # the reloaded viewer lost its highlights
+            self.refresh_compare()
             
     def populate_diff_view(self):
-        # Clear old items
-        for i in reversed(range(self.diff_layout.count())):
-            widget = self.diff_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
-        if not getattr(self, "differences", None):
-            return
-
-        # Group by page number
-        grouped = defaultdict(list)
-        for page, bbox, text, change_type in self.differences:
-            grouped[page].append((bbox, text, change_type))
-
-        # Sort by page number
-        for page in sorted(grouped.keys()):
-            # --- Create page section ---
-            page_frame = QFrame()
-            page_frame.setFrameShape(QFrame.StyledPanel)
-            page_frame.setStyleSheet("""
-                QFrame {
-                    background-color: #f7f7f7;
-                    border: 1px solid #ccc;
-                    border-radius: 1px;
-                }
-            """)
-            
-            page_frame.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Maximum)
-
-            page_layout = QVBoxLayout(page_frame)
-            page_layout.setContentsMargins(6, 6, 6, 6)
-            page_layout.setSpacing(6)
-
-            # --- Page title ---
-            title = QLabel(f"<h4> Page {page + 1}</h4>")
-            title.setAlignment(Qt.AlignLeft)
-            page_layout.addWidget(title)
-
-            # --- Each change for that page ---
-            for bbox, text, change_type in grouped[page]:
-
-                diff_frame = ClickableFrame()
-                diff_frame.setFrameShape(QFrame.StyledPanel)
-                # make the right diff window slightly smaller
-                diff_frame.setFixedWidth(260)
-                
-                if change_type == "added":
-                    diff_frame.setStyleSheet(f"""
-                        QFrame {{
-                            background-color: #e6ffe6;
-                            border: 1px solid #00cc00;
-                            border-radius: 5px; }}
-                    """)
-                else:
-                    diff_frame.setStyleSheet(f"""
-                        QFrame {{
-                            background-color: #ffe6e6;
-                            border: 1px solid #cc0000;
-                            border-radius: 5px; }}
-                    """)
-                    
-                diff_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-
-                if change_type == "added":
-                    diff_frame.clicked.connect(lambda p=page, b=bbox: self.right_pdf_viewer.smooth_scroll_to_bbox(p, b))
-                else:
-                    diff_frame.clicked.connect(lambda p=page, b=bbox: self.left_pdf_viewer.smooth_scroll_to_bbox(p, b))
-                    
-                    
-                diff_layout = QVBoxLayout(diff_frame)
-                diff_layout.setContentsMargins(3, 2, 3, 2)
-                diff_layout.setSpacing(2)
-
-
-                title_label = QLabel(f"<b>{change_type.capitalize()}</b>")
-                text_label = QLabel(text[:300] + ("..." if len(text) > 300 else ""))
-                text_label.setWordWrap(True)
-                text_label.setStyleSheet(f"""
-                        QFrame {{
-                            border: none;
-                             }}
-                    """)
-
-                diff_layout.addWidget(title_label)
-                diff_layout.addWidget(text_label)
-
-                page_layout.addWidget(diff_frame)
-
-            # Add some spacing between pages
-            self.diff_layout.addWidget(page_frame)
-
-        # Push everything to top
-        self.diff_layout.addStretch()
+        self.diff_model.set_differences(self.differences)
+        self._index_differences()
+
+    def _index_differences(self, start=0):
+        """Index self.differences[start:] for clicks; the ones before start are indexed already."""
+        if start == 0:
+            self.differences_sides = []
+        # Moved blocks are indexed twice: where they are now (right) and where they came from (left)
+        boxes, pages = [], []
+        for diff_index in range(start, len(self.differences)):
+            difference = self.differences[diff_index]
+            page, bbox, _, change_type = difference
+            if change_type == "moved":
+                boxes.append(tuple(difference.source_bbox))
+                pages.append(difference.source_page)
+                self.differences_sides.append((diff_index, "removed"))
+                change_type = "added"
+            boxes.append(tuple(bbox))
+            pages.append(page)
+            self.differences_sides.append((diff_index, change_type))
+        if start == 0:
+            self.differences_index = SpatialIndex(np.array(boxes).reshape(-1, 4), pages)
+        else:
+            self.differences_index.extend(np.array(boxes).reshape(-1, 4), pages)
+
+    def on_page_clicked(self, pdfDTO, change_type, page, x, y):
+        """Hit-test a click (PDF points) against the differences and words of that side."""
+        for entry in self.differences_index.at(page, x, y, tolerance=1.0).tolist():
+            diff_index, side = self.differences_sides[entry]
+            if side == change_type:
+                if self.differences[diff_index][3] == "moved":
+                    self.scroll_to_diff(diff_index)  # bring the other end of the move into view
+                index = self.diff_model.index(self.diff_model.row_of(diff_index))
+                self.changes_viewer.setCurrentIndex(index)
+                self.changes_viewer.scrollTo(index)
+                return
+        words = pdfDTO.index.at(page, x, y, tolerance=1.0)
+        if len(words):
+            self.statusBar().showMessage(f"Page {page + 1}: {pdfDTO.words.text(int(words[0]))}", 3000)
 
     def flash_highlight(self, widget):
         """Quickly flash a yellow border to show focus."""
@@ -206,37 +208,189 @@ class PDFComparator(QMainWindow, Ui_MainWindow):
         QTimer.singleShot(100, lambda: widget.setStyleSheet(original))
 
     def next_diff(self):
-        row = self.changes_viewer.currentRow()
-        if row < self.changes_viewer.count() - 1:
-            self.changes_viewer.setCurrentRow(row + 1)
-            self.scroll_to_diff(row + 1)
+        self._step_diff(1)
 
     def prev_diff(self):
-        row = self.changes_viewer.currentRow()
-        if row > 0:
-            self.changes_viewer.setCurrentRow(row - 1)
-            self.scroll_to_diff(row - 1)
+        self._step_diff(-1)
+
+    def _step_diff(self, step):
+        """Select the next/previous difference in the list (skipping page headers) and scroll to it."""
+        rows = self.diff_model.diff_rows()
+        if not rows:
+            return
+        current = self.changes_viewer.currentIndex().row()
+        if current in rows:
+            position = min(max(rows.index(current) + step, 0), len(rows) - 1)
+        else:
+            position = 0 if step > 0 else len(rows) - 1
+        index = self.diff_model.index(rows[position])
+        self.changes_viewer.setCurrentIndex(index)
+        self.changes_viewer.scrollTo(index)
+        self.scroll_to_diff(index.data(DiffListModel.DiffIndexRole))
 
     def scroll_to_diff(self, index):
-        """Scroll to the given diff on the viewer."""
-        page, bbox, text, change_type = self.differences[index]
-        # optionally scroll PDF viewer to this page or highlight it
-        print(f"Jumping to diff on page {page}: {text}")
+        """Scroll the viewer of the diff's side to the given diff."""
+        if index is None or not 0 <= index < len(self.differences):
+            return  # a page header
+        difference = self.differences[index]
+        page, bbox, text, change_type = difference
+        if change_type == "moved":
+            # Show both ends of the move side by side
+            self.left_pdf_viewer.smooth_scroll_to_bbox(difference.source_page, difference.source_bbox)
+            self.right_pdf_viewer.smooth_scroll_to_bbox(page, bbox)
+            return
+        viewer = self.right_pdf_viewer if change_type == "added" else self.left_pdf_viewer
+        viewer.smooth_scroll_to_bbox(page, bbox)
     
+    def zoom_viewers(self, action):
+        for viewer in (self.left_pdf_viewer, self.right_pdf_viewer):
+            action(viewer)
+
     def compare_pdfs(self):
         if not self.left_pdf_path or not self.right_pdf_path:
             return
+        if self.compare_thread or self.compared_key == self.pdfworker.result_key():
+            return  # still running or already showing this result
+        if self.cancelled_thread:
+            # Both runs would share the worker's documents and results; start once the old one has stopped
+            self.restart_pending = True
+            return
+
+        if self.pdfworker.visual_diff:
+            # Pages already rendered on screen don't need rendering again for the raster diff
+            dpi = self.pdfworker.raster_dpi
+            self.pdfworker.page_images = {
+                (side, page_num): image
+                for side, viewer in (("left", self.left_pdf_viewer), ("right", self.right_pdf_viewer))
+                for page_num, image in viewer.gray_page_images(dpi).items()}
+
+        thread = CompareThread(self.pdfworker, self)
+        thread.progress.connect(lambda percent, stage: self.statusBar().showMessage(f"{stage}... {percent}%"))
+        thread.chunk_ready.connect(lambda diffs, added, removed, t=thread: self.on_compare_chunk(t, diffs, added, removed))
+        thread.result_ready.connect(lambda diffs, t=thread: self.on_compare_finished(t, diffs))
+        thread.failed.connect(lambda msg, t=thread: self.on_compare_failed(t, msg))
+        thread.cancelled.connect(lambda: self.statusBar().showMessage("Comparison cancelled", 3000))
+        thread.finished.connect(lambda t=thread: self.on_compare_stopped(t))
+        thread.finished.connect(thread.deleteLater)
+        self.compare_thread = thread
+        self.streamed_regions = 0  # regions of this run already shown
+        self.view_metrics = Metrics()
+        self.pushButton_5.setEnabled(False)
+        thread.start()
+
+    def refresh_compare(self):
+        """Once a comparison is on screen, re-run it after a reload or engine change.
+
+        Results for pairs and engines seen before come from PDFWorker's caches."""
         if self.compared:
-            return  # already compared
+            self.cancel_compare()
+            self.compare_pdfs()
+
+    def cancel_compare(self):
+        """Abort a running comparison; its results will be ignored.
+
+        The thread stops at its next progress report. Until then it still uses
+        the worker, so compare_pdfs holds back a new run until it has stopped."""
+        if not self.compare_thread:
+            return
+        self.compare_thread.requestInterruption()
+        self.cancelled_thread = self.compare_thread
+        self.compare_thread = None
+        self.pushButton_5.setEnabled(True)
+
+    def wait_for_cancelled(self):
+        """Block until a cancelled comparison has stopped using the worker."""
+        if self.cancelled_thread:
+            self.cancelled_thread.wait()
+
+    def on_compare_stopped(self, thread):
+        if thread is not self.cancelled_thread:
+            return  # a run that wasn't cancelled; its result was handled already
+        self.cancelled_thread = None
+        if self.restart_pending:
+            self.restart_pending = False
+            self.compare_pdfs()
+
+    def on_compare_failed(self, thread, message):
+        if thread is not self.compare_thread:
+            return
+        self.compare_thread = None
+        self.pushButton_5.setEnabled(True)
+        self.statusBar().showMessage(f"Comparison failed: {message}")
+
+    def on_compare_chunk(self, thread, differences, diffs_right, diffs_left):
+        """Show one streamed region: the first replaces the previous result, later ones are appended."""
+        if thread is not self.compare_thread:
+            return  # stale region from a cancelled run
+        with self.view_metrics.stage("view"):
+            pdfDTOLeft, pdfDTORight = self.pdfworker.pdfDTOLeft, self.pdfworker.pdfDTORight
+            if self.streamed_regions == 0:
+                self.differences = list(differences)
+                self.populate_diff_view()
+                self.left_pdf_viewer.set_highlights(diffs_left, pdfDTOLeft, color=(1.0, 0.0, 0.0))
+                self.right_pdf_viewer.set_highlights(diffs_right, pdfDTORight, color=(0.0, 0.8, 0.0))
+            else:
+                start = len(self.differences)
+                self.differences.extend(differences)
+                self.diff_model.add_differences(differences)
+                self._index_differences(start)
+                self.left_pdf_viewer.highlight_differences(diffs_left, pdfDTOLeft, color=(1.0, 0.0, 0.0))
+                self.right_pdf_viewer.highlight_differences(diffs_right, pdfDTORight, color=(0.0, 0.8, 0.0))
+            self._highlight_regions(differences)
+        self.streamed_regions += 1
+
+    def _highlight_regions(self, differences):
+        """Highlight the differences that have no word-level diffs behind them by their boxes:
+        visual changes, and moved blocks at both ends."""
+        for viewer, change_type, color in ((self.left_pdf_viewer, "removed", (1.0, 0.0, 0.0)),
+                                           (self.right_pdf_viewer, "added", (0.0, 0.8, 0.0))):
+            viewer.highlight_regions([(page, bbox) for page, bbox, text, kind in differences
+                                      if text == VISUAL_CHANGE and kind == change_type], color)
+        moved = [difference for difference in differences if difference[3] == "moved"]
+        self.left_pdf_viewer.highlight_regions([(d.source_page, d.source_bbox) for d in moved], self.MOVED_COLOR)
+        self.right_pdf_viewer.highlight_regions([(d[0], d[1]) for d in moved], self.MOVED_COLOR)
+
+    def on_compare_finished(self, thread, differences):
+        if thread is not self.compare_thread:
+            return  # stale result from a cancelled run
+        self.compare_thread = None
+        self.pushButton_5.setEnabled(True)
         self.compared = True
-        self.pdfworker.compare_pdf()
-        diffs_left, diffs_right = self.pdfworker.removed_diffs, self.pdfworker.added_diffs
-        pdfDTOLeft, pdfDTORight = self.pdfworker.pdfDTOLeft, self.pdfworker.pdfDTORight
-        self.differences = self.pdfworker._differences
-        self.populate_diff_view()
-        self.left_pdf_viewer.highlight_differences(diffs_left, pdfDTOLeft, color=(1, 0, 0))
-        self.right_pdf_viewer.highlight_differences(diffs_right, pdfDTORight, color=(0, 1, 0))
-        self.left_pdf_viewer.clear_pdf()
-        self.right_pdf_viewer.clear_pdf()
-        self.left_pdf_viewer.draw_pdf(pdfDTOLeft.pdf_data)
-        self.right_pdf_viewer.draw_pdf(pdfDTORight.pdf_data)
\ No newline at end of file
+        self.compared_key = self.pdfworker.differences_key
+        self.statusBar().showMessage(f"{len(differences)} differences found", 5000)
+        # Streamed regions are on screen already, unless move detection changed the result afterwards
+        moves_found = any(change_type == "moved" for _, _, _, change_type in differences)
+        if not self.streamed_regions or (moves_found and differences != self.differences):
+            diffs_left, diffs_right = self.pdfworker.removed_diffs, self.pdfworker.added_diffs
+            pdfDTOLeft, pdfDTORight = self.pdfworker.pdfDTOLeft, self.pdfworker.pdfDTORight
+            with self.view_metrics.stage("view"):
+                if differences != self.differences:
+                    self.differences = differences
+                    self.populate_diff_view()
+                # The pages are already rendered from the shared documents; only pages whose highlights changed repaint
+                self.left_pdf_viewer.set_highlights(diffs_left, pdfDTOLeft, color=(1.0, 0.0, 0.0))
+                self.right_pdf_viewer.set_highlights(diffs_right, pdfDTORight, color=(0.0, 0.8, 0.0))
+                self._highlight_regions(differences)
+        self.show_metrics()
+
+    def metrics_report(self):
+        """PDFWorker.metrics_report() plus the time the GUI spent showing the result."""
+        report = self.pdfworker.metrics_report()
+        report["view"] = self.view_metrics.as_dict()
+        return report
+
+    def show_metrics(self):
+        """Show the main stage timings and the size of the last compare in the status bar."""
+        report = self.metrics_report()
+        stages = defaultdict(float)
+        for part in report.values():
+            for name, seconds in part["stages"].items():
+                stages[name] += seconds
+        counters = report["compare"]["counters"]
+        timings = " · ".join(f"{name} {stages[name]:.2f}s"
+                             for name in ("load", "engine", "group", "cluster", "visual", "view") if name in stages)
+        self.metrics_label.setText(
+            f"{timings} | {counters.get('pages', 0)} pages · {counters.get('words', 0)} words · "
+            f"edit distance {counters.get('edit_distance', 0)} · {counters.get('groups', 0)} groups · "
+            f"peak {counters.get('peak_rss_mb', 0):.0f} MB")
+        self.metrics_label.setToolTip(json.dumps(report, indent=2))
@@ -1,5 +1,23 @@
+import numpy as np
+
+from src.wordtable import WordTable
+from src.spatialindex import SpatialIndex
+from src.metrics import Metrics
+
 class PDFDTO:
     def __init__(self):
-        self.words_txt = []
-        self.words_pos = []
-        self.pdf_data = None # Actual PDF data object
\ No newline at end of file
+        self.words = WordTable()  # Columnar word store (text, bbox, page)
+        self.pdf_data = None # Actual PDF data object
+        self.key = None  # DocumentRegistry.key() of the loaded file
+        self.page_sizes = np.zeros((0, 2))  # (width, height) per page, in points
+        self.index = SpatialIndex(np.zeros((0, 4)), [])  # grid over the word bboxes
+        self.metrics = Metrics()  # stage timers and counters of the load
+
+    @property
+    def words_txt(self):
+        return self.words.texts
+
+    @property
+    def words_pos(self):
+        # Kept for older callers: indexing yields {"text", "bbox", "page_num"} dicts
+        return self.words
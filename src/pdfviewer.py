@@ -1,17 +1,24 @@
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QScrollArea, QFileDialog, QFrame, QSizePolicy
+    QPushButton, QScrollArea, QFileDialog, QFrame
 )
 from PySide6.QtGui import QPixmap, QPainter, QColor, QImage
-from PySide6.QtCore import Qt, QRect, Signal, QTimer, QPropertyAnimation, QEasingCurve
+from PySide6.QtCore import Qt, QRect, QRectF, QPoint, QEvent, QObject, Signal, QTimer, QPropertyAnimation, QEasingCurve
 from ui.ui_mainwindow import Ui_MainWindow  # the generated file
 import sys
-import fitz
-import comparemethods.myersdiff as myersdiff
-from io import BytesIO
-from PIL import Image
+import math
+import queue
+import pymupdf as fitz
+import bisect
+import numpy as np
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.documentregistry import DocumentRegistry
+from src.spatialindex import page_sizes
+
+# Side of a square tile, in device pixels at the tile's render scale
+TILE = 256
 
 class ClickableFrame(QFrame):
     clicked = Signal()
@@ -20,46 +27,195 @@ class ClickableFrame(QFrame):
         self.clicked.emit()
         super().mousePressEvent(event)
 
-class PDFPageLabel(QLabel):
-    """Custom QLabel that scales its pixmap to the label width and draws highlights
-       given in normalized coordinates (nx0, ny0, nx1, ny1) where ny uses PDF top origin (0..1)."""
-    def __init__(self, pixmap=None, highlights=None):
+class PixmapCache:
+    """LRU cache of rendered page pixmaps bounded by an approximate memory budget (bytes)."""
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._pixmaps = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+    def get(self, key):
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        """Insert a pixmap and return the keys evicted to stay within budget."""
+        if key in self._pixmaps:
+            self._size -= self.pixmap_bytes(self._pixmaps.pop(key))
+        self._pixmaps[key] = pixmap
+        self._size += self.pixmap_bytes(pixmap)
+        evicted = []
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self._size > self.budget_bytes and len(self._pixmaps) > 1:
+            old_key, old_pixmap = self._pixmaps.popitem(last=False)
+            self._size -= self.pixmap_bytes(old_pixmap)
+            evicted.append(old_key)
+        return evicted
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._size = 0
+
+
+class TileRenderer(QObject):
+    """Renders page tiles on a background thread.
+
+    MuPDF is not thread-safe, not even across separate documents, so tiles
+    are rendered one at a time from the viewer's own document while holding
+    `lock` (the registry's, see DocumentRegistry). The thread never calls
+    into Qt objects that live on the GUI thread: finished tiles are queued
+    and handed out through `tile_ready` (document, tile key, QImage) by a
+    timer on the GUI thread, which only runs while tiles are pending."""
+    tile_ready = Signal(object, object, object)
+    POLL_MS = 10
+
+    def __init__(self, lock, parent=None):
+        super().__init__(parent)
+        self._lock = lock
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiles")
+        self._pending = {}  # tile key -> Future
+        self._results = queue.SimpleQueue()
+        self._poll = QTimer(self)
+        self._poll.setInterval(self.POLL_MS)
+        self._poll.timeout.connect(self._deliver)
+
+    def request(self, pdf, key):
+        """Queue tile key (page, level, col, row) of the fitz document pdf."""
+        if key not in self._pending:
+            self._pending[key] = self._pool.submit(self._render, pdf, key)
+            self._poll.start()
+
+    def _deliver(self):
+        while True:
+            try:
+                pdf, key, image = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.pop(key, None)
+            if image is not None:
+                self.tile_ready.emit(pdf, key, image)
+        if not self._pending:
+            self._poll.stop()
+
+    def cancel(self, keep):
+        """Cancel queued tiles for which keep(key) is false; tiles already rendering still arrive."""
+        for key in [key for key in self._pending if not keep(key)]:
+            if self._pending[key].cancel():
+                del self._pending[key]
+
+    def clear(self):
+        """Cancel all queued tiles; the renderer holds no documents of its own, so nothing is left open."""
+        self.cancel(lambda key: False)
+        self._pending.clear()
+
+    def _render(self, pdf, key):
+        image = None
+        try:
+            with self._lock:
+                if not pdf.is_closed:  # closed since the tile was requested
+                    image = render_tile(pdf, *key)
+        finally:
+            # Always answer, so a failed tile doesn't keep the poll timer running
+            self._results.put((pdf, key, image))
+
+
+def render_scale(level):
+    """Render scale (1.0 = 72 DPI) of a tile level; each level is sqrt(2) finer than the one below."""
+    return 2 ** (level / 2)
+
+
+def tile_clip(page_size, level, col, row):
+    """Area of a tile in PDF points, cut off at the page edge."""
+    scale = render_scale(level)
+    width, height = page_size
+    return (col * TILE / scale, row * TILE / scale,
+            min(width, (col + 1) * TILE / scale), min(height, (row + 1) * TILE / scale))
+
+
+def render_tile(pdf, page_num, level, col, row):
+    """Render one tile as a QImage that owns its pixels (safe to create off the GUI thread)."""
+    page = pdf.load_page(page_num)
+    scale = render_scale(level)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False,
+                          clip=fitz.Rect(tile_clip((page.rect.width, page.rect.height), level, col, row)))
+    return QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+
+
+class PDFPageLabel(QWidget):
+    """One page of a PDFViewer: paints the page's tiles and then draws highlights
+       on top, given in normalized coordinates (nx0, ny0, nx1, ny1) where ny uses PDF top origin (0..1).
+       The viewer sets its width (set_page_width); the height follows from the page aspect ratio.
+       Clicks are reported as normalized (nx, ny) positions through `clicked`."""
+    clicked = Signal(float, float)
+
+    def __init__(self, page_num, viewer, highlights=None, page_size=None):
         super().__init__()
-        # keep a high-resolution original pixmap for high-quality scaling
-        self._orig_pixmap = pixmap
+        self.page_num = page_num
+        self.viewer = viewer  # paints the tiles, see PDFViewer.paint_page
+        # page_size=(width, height) in PDF points
+        self._aspect = page_size[1] / page_size[0] if page_size else 297 / 210  # A4
         # highlights: list of (norm_bbox, color) where norm_bbox=(nx0, ny_top, nx1, ny_bottom)
         # color is (r,g,b) ints 0..255
-        self.highlights = highlights or []
-        if pixmap:
-            # show scaled version immediately; do NOT permanently fix the height
-            self.setPixmap(pixmap)
-            # allow layout to compute sizes from sizeHint / updateGeometry
-            self.setMinimumHeight(1)
-        self.setScaledContents(False)
-        # Expand horizontally, allow vertical size to adapt
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self._update_scaled_pixmap()
-
-    def _update_scaled_pixmap(self):
-        if not self._orig_pixmap:
-            return
-        target_w = max(1, self.width())
-        # scale from the high-res original so downscaling remains sharp
-        scaled = self._orig_pixmap.scaledToWidth(target_w, Qt.SmoothTransformation)
-        self.setPixmap(scaled)
-        # update preferred/minimum/maximum so layouts can shrink/expand properly
-        self.setMinimumHeight(scaled.height())
-        self.setMaximumHeight(scaled.height())
-        self.updateGeometry()
+        self.highlights = list(highlights or [])
+        self.setAttribute(Qt.WA_OpaquePaintEvent)  # every pixel is painted, by tiles or white
+        self.setFixedSize(1, 1)
+
+    def set_page_width(self, width):
+        """Fix the page width in pixels and the height to match; the viewer calls this when its width changes."""
+        height = max(1, round(width * self._aspect))
+        if (width, height) != (self.width(), self.height()):
+            self.setFixedSize(width, height)
+
+    def mousePressEvent(self, event):
+        pos = event.position()
+        self.clicked.emit(pos.x() / max(1, self.width()), pos.y() / max(1, self.height()))
+        super().mousePressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self.viewer.paint_page(painter, self.page_num, self.width(), self.height(), event.rect())
+        if self.highlights:
+            # Highlights are vector overlays, so changing them never re-rasterizes the page
+            painter.setPen(Qt.NoPen)
+            w, h = self.width(), self.height()
+            for (nx0, ny0, nx1, ny1), (r, g, b) in self.highlights:
+                painter.setBrush(QColor(r, g, b, 70))
+                painter.drawRect(QRectF(nx0 * w, ny0 * h, max(1.0, (nx1 - nx0) * w), max(1.0, (ny1 - ny0) * h)))
+        painter.end()
 
 
 class PDFViewer(QWidget):
-    """ScrollArea-based PDF viewer."""
-    def __init__(self):
+    """ScrollArea-based PDF viewer.
+
+    Pages are laid out as placeholders and drawn from square tiles that are
+    rendered, with a fitz clip rectangle, at the resolution the current
+    width and zoom need. Render scales step by sqrt(2), so resizing only
+    re-renders when it crosses a step; in between the cached tiles are
+    scaled while painting. Tiles in or within PREFETCH_SCREENS viewport
+    heights of the visible area are rendered on a background thread and
+    kept in a size-bounded cache; until they arrive, cached tiles of
+    neighbouring levels stand in. Ctrl+wheel zooms around the cursor.
+    Clicks on a page are reported through `page_clicked` in PDF points."""
+    page_clicked = Signal(int, float, float)  # page number, x, y
+    # How many viewport heights above/below the visible area get rendered ahead of time
+    PREFETCH_SCREENS = 1.0
+    DEFAULT_CACHE_BUDGET = 512 * 1024 * 1024
+    # Tile levels (see render_scale): finest is 8x (576 DPI)
+    MAX_LEVEL = 6
+    # Zoom is relative to fitting the page width into the viewer
+    MIN_ZOOM = 0.25
+    MAX_ZOOM = 8.0
+    ZOOM_STEP = 1.25
+
+    def __init__(self, cache_budget=DEFAULT_CACHE_BUDGET, registry=None):
         super().__init__()
+        self.registry = registry if registry is not None else DocumentRegistry()
         layout = QVBoxLayout(self)
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
@@ -68,60 +224,318 @@ class PDFViewer(QWidget):
         self.scroll_area.setWidget(self.content_widget)
         layout.addWidget(self.scroll_area)
         self.page_labels = []
+        self.pdf = None
+        self.page_sizes = np.zeros((0, 2))  # (width, height) per page, in points
+        self._pdf_acquired = False  # True when self.pdf came from the registry
+        self.zoom = 1.0
+        # Tiles by (page, level, col, row); the levels cached per page are tracked for fallbacks
+        self.pixmap_cache = PixmapCache(cache_budget)
+        self._page_levels = defaultdict(set)
+        self.renderer = TileRenderer(self.registry.lock, self)
+        self.renderer.tile_ready.connect(self._on_tile_ready)
+
+        # Coalesce scroll/resize bursts into a single render pass
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(30)
+        self._render_timer.timeout.connect(self.render_visible_pages)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(lambda _: self._render_timer.start())
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(lambda _: self._render_timer.start())
+        self.scroll_area.viewport().installEventFilter(self)
 
     def load_pdf(self, path, highlights=None):
-        pdf = fitz.open(path)
+        pdf = self.registry.acquire(path)
         # Clear old pages
         self.clear_pdf()
 
         self.draw_pdf(pdf, highlights)
-            
+        self._pdf_acquired = True
+
     def draw_pdf(self, pdf, highlights=None):
-        # Render pages at higher resolution for better quality when scaling.
-        # Choose a render_scale: 1.0 = 72 DPI, 2.0 = ~144 DPI
-        RENDER_SCALE = 2.4
-        for page_num in range(pdf.page_count):
-            page = pdf.load_page(page_num)
-            mat = fitz.Matrix(RENDER_SCALE, RENDER_SCALE)
-            pix = page.get_pixmap(matrix=mat)
-             # Convert fitz Pixmap directly to QImage, then QPixmap
-            if pix.alpha:
-                fmt = QImage.Format_RGBA8888
-            else:
-                fmt = QImage.Format_RGB888
-            qt_image = QImage(pix.samples, pix.width, pix.height, pix.stride, fmt)
-            qt_pixmap = QPixmap.fromImage(qt_image)
-
-            label = PDFPageLabel(qt_pixmap, highlights)
-            label.setAlignment(Qt.AlignCenter)
+        """Lay out one placeholder per page; tiles are rendered lazily on scroll."""
+        self.pdf = pdf
+        with self.registry.lock:
+            self.page_sizes = page_sizes(pdf)
+        width = self._zoomed_width()
+        for page_num, page_size in enumerate(self.page_sizes.tolist()):
+            label = PDFPageLabel(page_num, self, highlights=highlights, page_size=page_size)
+            label.clicked.connect(lambda nx, ny, p=page_num: self._on_label_clicked(p, nx, ny))
             self.scroll_layout.addWidget(label)
+            self._apply_page_width(label, width)
             self.page_labels.append(label)
-            
+        self._render_timer.start()
+
+    def _on_label_clicked(self, page_num, nx, ny):
+        width, height = self.page_sizes[page_num]
+        self.page_clicked.emit(page_num, nx * width, ny * height)
+
+    # --- tiles -----------------------------------------------------------------------
+
+    def _level(self, page_num, width):
+        """Tile level for a page shown `width` pixels wide: the coarsest that is not upscaled."""
+        scale = width * self.devicePixelRatioF() / self.page_sizes[page_num][0]
+        return min(self.MAX_LEVEL, max(-6, math.ceil(2 * math.log2(max(scale, 1e-3)) - 1e-9)))
+
+    def _tiles(self, page_num, level, x0, y0, x1, y1):
+        """Keys of the tiles at `level` that cover the area (x0, y0, x1, y1) in PDF points."""
+        scale = render_scale(level)
+        width, height = self.page_sizes[page_num].tolist()
+        x0, y0 = max(0.0, x0), max(0.0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        if x1 <= x0 or y1 <= y0:
+            return []
+        cols = range(int(x0 * scale // TILE), math.ceil(x1 * scale / TILE))
+        rows = range(int(y0 * scale // TILE), math.ceil(y1 * scale / TILE))
+        return [(page_num, level, col, row) for row in rows for col in cols]
+
+    def paint_page(self, painter, page_num, width, height, rect):
+        """Paint the part `rect` of a page shown at width x height from cached tiles.
+
+        Tiles at the right level that are not cached yet are requested; cached
+        tiles of other levels are drawn first so the page is never blank."""
+        painter.fillRect(rect, Qt.white)
+        if self.pdf is None or page_num >= len(self.page_sizes):
+            return
+        page_size = self.page_sizes[page_num].tolist()
+        to_points = page_size[0] / max(1, width)
+        area = (rect.left() * to_points, rect.top() * to_points,
+                (rect.right() + 1) * to_points, (rect.bottom() + 1) * to_points)
+        level = self._level(page_num, width)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        # Coarse to fine, so the best available tile ends up on top
+        for other in sorted(l for l in self._page_levels.get(page_num, ()) if l <= level + 2):
+            if other != level:
+                self._draw_tiles(painter, page_size, width, self._tiles(page_num, other, *area), request=False)
+        self._draw_tiles(painter, page_size, width, self._tiles(page_num, level, *area), request=True)
+
+    def _draw_tiles(self, painter, page_size, width, keys, request):
+        scale = width / page_size[0]
+        for key in keys:
+            pixmap = self.pixmap_cache.get(key)
+            if pixmap is None:
+                if request:
+                    self._request_tile(key)
+                continue
+            x0, y0, x1, y1 = tile_clip(page_size, *key[1:])
+            painter.drawPixmap(QRectF(x0 * scale, y0 * scale, (x1 - x0) * scale, (y1 - y0) * scale),
+                               pixmap, QRectF(pixmap.rect()))
+
+    def _request_tile(self, key):
+        self.renderer.request(self.pdf, key)
+
+    def _on_tile_ready(self, pdf, key, image):
+        if pdf is not self.pdf or key[0] >= len(self.page_labels):
+            return  # rendered for a document that has been closed since
+        self.pixmap_cache.put(key, QPixmap.fromImage(image))
+        self._page_levels[key[0]].add(key[1])
+        label = self.page_labels[key[0]]
+        scale = label.width() / self.page_sizes[key[0]][0]
+        x0, y0, x1, y1 = tile_clip(self.page_sizes[key[0]].tolist(), *key[1:])
+        label.update(QRectF(x0 * scale, y0 * scale, (x1 - x0) * scale, (y1 - y0) * scale).toAlignedRect())
+
+    def _wanted_pages(self):
+        """Range of page indices in or near the viewport."""
+        if not self.page_labels:
+            return range(0)
+        viewport_h = self.scroll_area.viewport().height()
+        margin = int(viewport_h * self.PREFETCH_SCREENS)
+        top = self.scroll_area.verticalScrollBar().value() - margin
+        bottom = top + viewport_h + 2 * margin
+        first = bisect.bisect_right(self.page_labels, top, key=lambda l: l.y() + l.height())
+        last = bisect.bisect_left(self.page_labels, bottom, key=lambda l: l.y())
+        return range(min(first, len(self.page_labels) - 1), max(last, first + 1))
+
+    def render_visible_pages(self):
+        """Request the tiles in and near the viewport, and drop queued ones that went out of range."""
+        if self.pdf is None or not self.page_labels:
+            return
+        # Freshly added placeholders take a few layout passes to get their final
+        # heights; until then they overlap and every page would look visible
+        first, last = self.page_labels[0], self.page_labels[-1]
+        if len(self.page_labels) > 1 and last.y() < first.y() + first.height():
+            if self.isVisible():
+                self._render_timer.start()  # try again once the layout has settled
+            return
+        viewport = self.scroll_area.viewport()
+        margin = int(viewport.height() * self.PREFETCH_SCREENS)
+        left = self.scroll_area.horizontalScrollBar().value()
+        top = self.scroll_area.verticalScrollBar().value()
+        wanted_tiles = set()
+        # The visible part first, so it renders before the prefetched margins
+        for extra in (0, margin):
+            y0, y1 = top - extra, top + viewport.height() + extra
+            for page_num in self._wanted_pages():
+                label = self.page_labels[page_num]
+                to_points = self.page_sizes[page_num][0] / max(1, label.width())
+                keys = self._tiles(page_num, self._level(page_num, label.width()),
+                                   (left - label.x()) * to_points, (y0 - label.y()) * to_points,
+                                   (left + viewport.width() - label.x()) * to_points, (y1 - label.y()) * to_points)
+                for key in keys:
+                    if key not in wanted_tiles and self.pixmap_cache.get(key) is None:
+                        self._request_tile(key)
+                    wanted_tiles.add(key)
+        self.renderer.cancel(wanted_tiles.__contains__)
+
+    # --- zoom ------------------------------------------------------------------------
+
+    def _zoomed_width(self):
+        """Page width in pixels at the current zoom; zoom 1 fits the width of the viewer."""
+        margins = self.scroll_layout.contentsMargins()
+        fit = self.scroll_area.viewport().width() - margins.left() - margins.right()
+        return max(16, int(fit * self.zoom))
+
+    def _apply_page_width(self, label, width):
+        label.set_page_width(width)
+        # Narrower than the viewer: center the page instead of pinning it left
+        self.scroll_layout.setAlignment(label, Qt.AlignHCenter if self.zoom < 1 else Qt.AlignmentFlag(0))
+
+    def set_zoom(self, zoom, anchor=None):
+        """Zoom relative to fitting the width, keeping the point under anchor (viewport coordinates) in place."""
+        zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, zoom))
+        if abs(zoom - 1.0) < 1e-3:
+            zoom = 1.0
+        if zoom == self.zoom:
+            return
+        viewport = self.scroll_area.viewport()
+        anchor = anchor or QPoint(viewport.width() // 2, viewport.height() // 2)
+        hbar, vbar = self.scroll_area.horizontalScrollBar(), self.scroll_area.verticalScrollBar()
+        target = None
+        if self.page_labels:
+            # Remember the page point under the anchor
+            y = vbar.value() + anchor.y()
+            page_num = min(bisect.bisect_right(self.page_labels, y, key=lambda l: l.y() + l.height()),
+                           len(self.page_labels) - 1)
+            label = self.page_labels[page_num]
+            target = (label, (hbar.value() + anchor.x() - label.x()) / max(1, label.width()),
+                      (y - label.y()) / max(1, label.height()))
+
+        self.zoom = zoom
+        width = self._zoomed_width()
+        for label in self.page_labels:
+            self._apply_page_width(label, width)
+        # Lay out now, so the scroll position can be restored before anything is painted
+        self.scroll_layout.activate()
+        self.content_widget.resize(max(viewport.width(), self.content_widget.minimumSizeHint().width()),
+                                   max(viewport.height(), self.content_widget.minimumSizeHint().height()))
+        self.scroll_layout.activate()
+        if target is not None:
+            label, nx, ny = target
+            hbar.setValue(int(label.x() + nx * label.width() - anchor.x()))
+            vbar.setValue(int(label.y() + ny * label.height() - anchor.y()))
+        self._render_timer.start()
+
+    def zoom_in(self):
+        self.set_zoom(self.zoom * self.ZOOM_STEP)
+
+    def zoom_out(self):
+        self.set_zoom(self.zoom / self.ZOOM_STEP)
+
+    def reset_zoom(self):
+        self.set_zoom(1.0)
+
+    def eventFilter(self, watched, event):
+        if (watched is self.scroll_area.viewport() and event.type() == QEvent.Wheel
+                and event.modifiers() & Qt.ControlModifier):
+            steps = event.angleDelta().y() / 120
+            if steps:
+                self.set_zoom(self.zoom * self.ZOOM_STEP ** steps, event.position().toPoint())
+            return True
+        if watched is self.scroll_area.viewport() and event.type() == QEvent.Resize:
+            width = self._zoomed_width()
+            if self.page_labels and width != self.page_labels[0].width():
+                for label in self.page_labels:
+                    self._apply_page_width(label, width)
+            self._render_timer.start()
+        return super().eventFilter(watched, event)
+
     def highlight_differences(self, diffs, pdfDTO, color=(1, 0, 0)):
+        """Add highlights for the given diffs on top of the existing ones."""
+        for page_num, highlights in self._page_highlights(diffs, pdfDTO, color).items():
+            if 0 <= page_num < len(self.page_labels):
+                label = self.page_labels[page_num]
+                label.highlights.extend(highlights)
+                label.update()
+
+    def highlight_regions(self, regions, color=(1, 0, 0)):
+        """Add highlights for (page_num, bbox) pairs in PDF points, e.g. visual changes."""
+        norm_color = _normalize_qcolor(color)
+        for page_num, (x0, y0, x1, y1) in regions:
+            if 0 <= page_num < len(self.page_labels):
+                width, height = self.page_sizes[page_num].tolist()
+                label = self.page_labels[page_num]
+                label.highlights.append(((x0 / width, y0 / height, x1 / width, y1 / height), norm_color))
+                label.update()
+
+    def gray_page_images(self, dpi):
+        """Grayscale uint8 arrays at `dpi` of the pages fully covered by cached tiles, by page number.
+
+        Lets a visual comparison reuse pages that are on screen instead of rendering them again."""
+        images = {}
+        for page_num in range(len(self.page_labels)):
+            page_image = self._cached_page_image(page_num, dpi / 72)
+            if page_image is None:
+                continue
+            width, height = (self.page_sizes[page_num] * dpi / 72).round().astype(int).tolist()
+            image = page_image.convertToFormat(QImage.Format_Grayscale8).scaled(
+                width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            rows = np.frombuffer(image.constBits(), dtype=np.uint8).reshape(height, image.bytesPerLine())
+            images[page_num] = rows[:, :width].copy()
+        return images
+
+    def _cached_page_image(self, page_num, min_scale):
+        """The whole page put together from cached tiles of one level, or None.
+
+        Prefers the coarsest level at least min_scale fine, else the finest there is."""
+        levels = sorted(self._page_levels.get(page_num, ()))
+        levels = [l for l in levels if render_scale(l) >= min_scale] + [l for l in reversed(levels)
+                                                                        if render_scale(l) < min_scale]
+        page_size = self.page_sizes[page_num].tolist()
+        for level in levels:
+            keys = self._tiles(page_num, level, 0, 0, *page_size)
+            pixmaps = [self.pixmap_cache.get(key) for key in keys]
+            if any(pixmap is None for pixmap in pixmaps):
+                continue
+            scale = render_scale(level)
+            image = QImage(math.ceil(page_size[0] * scale), math.ceil(page_size[1] * scale), QImage.Format_RGB888)
+            image.fill(Qt.white)
+            painter = QPainter(image)
+            for key, pixmap in zip(keys, pixmaps):
+                painter.drawPixmap(key[2] * TILE, key[3] * TILE, pixmap)
+            painter.end()
+            return image
+        return None
+
+    def set_highlights(self, diffs, pdfDTO, color=(1, 0, 0)):
+        """Replace all highlights with the given diffs, repainting only pages whose highlights changed."""
+        highlights_by_page = self._page_highlights(diffs, pdfDTO, color)
+        for page_num, label in enumerate(self.page_labels):
+            highlights = highlights_by_page.get(page_num, [])
+            if label.highlights != highlights:
+                label.highlights = highlights
+                label.update()
+
+    def _page_highlights(self, diffs, pdfDTO, color):
+        """Normalized highlight rectangles of the diffs, grouped by page number."""
         norm_color = _normalize_qcolor(color)
         highlights_by_page = defaultdict(list)
+        if not diffs:
+            return highlights_by_page
 
-        for idx, char in diffs:
-            word = pdfDTO.words_pos[idx]
-            bbox = word["bbox"]
-            page_num = word["page_num"]
-            page = pdfDTO.pdf_data[page_num]
-            page_rect = page.rect
-            # Normalize bbox to (0..1) range
-            x0, y0, x1, y1 = bbox
-            nx0 = x0 / page_rect.width
-            nx1 = x1 / page_rect.width
-            # PDF y origin is top, so invert y coords
-            ny0 = 1.0 - (y1 / page_rect.height)
-            ny1 = 1.0 - (y0 / page_rect.height)
-            norm_bbox = (nx0, ny0, nx1, ny1)
+        words = pdfDTO.words
+        indices = np.fromiter((idx for idx, _ in diffs), dtype=np.int64, count=len(diffs))
+        pages = words.page_num[indices]
+        # Normalize all bboxes to (0..1) at once with the cached page sizes;
+        # fitz already uses a top-left origin, same as the label
+        sizes = pdfDTO.page_sizes[pages]
+        norm = words.bbox[indices] / np.hstack([sizes, sizes])
+        for page_num, norm_bbox in zip(pages.tolist(), map(tuple, norm.tolist())):
             highlights_by_page[page_num].append((norm_bbox, norm_color))
+        return highlights_by_page
 
-        # Apply highlights to each page label
-        for page_num, highlights in highlights_by_page.items():
-            if 0 <= page_num < len(self.page_labels):
-                label = self.page_labels[page_num]
-                label.highlights.extend(highlights)
+    def clear_highlights(self):
+        for label in self.page_labels:
+            if label.highlights:
+                label.highlights = []
                 label.update()
             
     # def highlight_differences(self, diffs, pdfDTO, color=(1, 0, 0)):
@@ -147,6 +561,14 @@ class PDFViewer(QWidget):
             self.scroll_layout.removeWidget(label)
             label.deleteLater()
         self.page_labels = []
+        self.renderer.clear()
+        self.pixmap_cache.clear()
+        self._page_levels.clear()
+        self.page_sizes = np.zeros((0, 2))
+        if self._pdf_acquired:
+            self.registry.release(self.pdf)
+        self._pdf_acquired = False
+        self.pdf = None
             
     def smooth_scroll_to_bbox(self, page_index: int, bbox, duration: int = 400):
         """Smoothly scroll to a bounding box within a given page."""
@@ -156,14 +578,17 @@ class PDFViewer(QWidget):
         page_label = self.page_labels[page_index]
         base_y = page_label.pos().y()
 
-        # Get pixmap and sizes
-        pixmap = page_label.pixmap()
-        pixmap_height = pixmap.height() if pixmap else page_label.height()
-        page_height = page_label.height()
-
+        # bbox is in PDF points; the label shows the page scaled to its height
+        scale = page_label.height() / self.page_sizes[page_index][1]
         x0, y0, x1, y1 = bbox
 
-        target_y = int(base_y + (y1 + y0 - page_height)/2)
+        # Center the bbox in the viewport
+        viewport_height = self.scroll_area.viewport().height()
+        target_y = int(base_y + (y0 + y1) / 2 * scale - viewport_height / 2)
+        if self.zoom > 1.0:
+            # Zoomed in, the page is wider than the viewer: center horizontally too
+            target_x = int(page_label.pos().x() + (x0 + x1) / 2 * scale - self.scroll_area.viewport().width() / 2)
+            self.scroll_area.horizontalScrollBar().setValue(target_x)
 
         scroll_bar = self.scroll_area.verticalScrollBar()
         current_value = scroll_bar.value()
@@ -179,16 +604,7 @@ class PDFViewer(QWidget):
         if not hasattr(self, "_scroll_anims"):
             self._scroll_anims = []
         self._scroll_anims.append(anim)
-        
-        
-    @staticmethod
-    def pil_to_qpixmap(img):
-        """Convert PIL image to QPixmap"""
-        buf = BytesIO()
-        img.save(buf, format="PNG")
-        pixmap = QPixmap()
-        pixmap.loadFromData(buf.getvalue(), "PNG")
-        return pixmap
+
 
 def _normalize_qcolor(color):
     """Return (r,g,b) ints 0..255 from float tuple (0..1) or int tuple."""
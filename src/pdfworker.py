@@ -1,12 +1,88 @@
-import fitz
-from comparemethods.myersdiff import MyersDiff
-from comparemethods.deepdiffcompare import DeepDiffCompare
-from comparemethods.sequencematchercompare import SequenceMatcherCompare
-from comparemethods.hirschbergcompare import HirschbergCompare
+import pymupdf as fitz
+import os
+import bisect
+from itertools import chain, compress
+from operator import itemgetter
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from comparemethods import engines
+from comparemethods.linearmyersdiff import LinearMyersDiff  # aligns page hashes for page anchoring
 from src.pdfdto import *
+from src.documentregistry import DocumentRegistry
+from src.wordtable import WordTable, shared_token_ids
+from src.spatialindex import SpatialIndex, page_sizes
+from src import rasterdiff
+from src import movedetect
+from src import outofcore
+from src.metrics import Metrics, current_rss_mb, peak_rss_mb, profiling
+
+# Lookup table: _IS_SPACE[cp] is chr(cp).isspace(); the last entry stands for every higher code point
+_IS_SPACE = np.array([chr(cp).isspace() for cp in range(0x3001)] + [False])
+_get_chars, _get_c, _get_bbox = itemgetter("chars"), itemgetter("c"), itemgetter("bbox")
+
+class CompareCancelled(Exception):
+    """Raised from a compare_pdf progress callback to abort the comparison."""
+    pass
+
+def _extract_page_range(file_path, start, stop, x_threshold=2.0):
+    """Process-pool entry point: open a private handle and extract pages [start, stop)."""
+    pdf = fitz.open(file_path)
+    try:
+        return PDFWorker.extract_words(pdf, start, stop, x_threshold)
+    finally:
+        pdf.close()
 
 class PDFWorker:
-    def __init__(self):
+    # Documents with fewer pages than this are extracted serially;
+    # below it the process start-up costs more than it saves
+    PARALLEL_MIN_PAGES = 64
+    # Each worker gets roughly this many shards so uneven pages balance out
+    SHARDS_PER_WORKER = 4
+    # Fewer page pairs than this are rasterized in-process
+    RASTER_PARALLEL_MIN_PAGES = 16
+    # Extracted documents kept in memory, so reloading a recent file costs nothing
+    WORD_CACHE_SIZE = 4
+    # Compare results kept in memory per (left, right, engine), so toggling engines is instant
+    RESULT_CACHE_SIZE = 16
+
+    def __init__(self, registry=None, extract_workers=None, cache=None):
+        # Shared with the viewers so every file is opened only once
+        self.registry = registry if registry is not None else DocumentRegistry()
+        # Number of extraction processes; 1 disables parallel extraction
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        # Optional ExtractionCache; None disables the on-disk cache
+        self.cache = cache
+        # Horizontal gap (points) that splits two characters into separate words
+        self.x_threshold = 2.0
+        # Match identical pages first and run the engine only on the pages in between
+        self.page_anchoring = True
+        # With page anchoring, runs of changed pages longer than this many words are
+        # cut into regions at long unique matches, so results can stream out early
+        self.region_words = 4000
+        # Also merge changes that are close on the page, not just adjacent in reading order
+        self.spatial_clustering = False
+        self.cluster_gap = 12.0  # points
+        # Report blocks of at least this many words that were removed in one place and
+        # added in another as one "moved" difference; 0 disables move detection
+        self.move_min_words = movedetect.MIN_WORDS
+        # Also compare rendered pages that have images or no text (scans), see rasterdiff
+        self.visual_diff = False
+        self.raster_dpi = 50
+        # Optional dict {("left" | "right", page_num): grayscale uint8 array at raster_dpi},
+        # e.g. made from a viewer's rendered pixmaps; used when both pages of a pair are in it
+        self.page_images = {}
+        # Extract into memory-mapped spill files and diff in bounded windows, for documents
+        # too large for RAM; keeps the RSS near memory_limit_mb (see outofcore)
+        self.out_of_core = False
+        self.memory_limit_mb = 1024
+        self.spill_dir = None  # None: the system temp directory
+        self._spill_vocab, self._spill_index = [], {}  # shared by both spilled documents
+        self._word_cache = OrderedDict()    # (file key, x_threshold) -> (WordTable, page sizes, SpatialIndex)
+        self._result_cache = OrderedDict()  # result_key() -> (added, removed, differences)
+        self.differences_key = None  # result_key() of the stored _differences
+        self.metrics = Metrics()  # stage timers and counters of the last compare
         self.left_pdf = None
         self.right_pdf = None
         
@@ -15,39 +91,143 @@ class PDFWorker:
         
         
         self._differences = []  # Stores differences between PDFs for later visualization
+        # Engine class, None for engines.DEFAULT; engines are imported only once selected
         self._selectedCompareMethod = None
-        self._compareMethod1 = MyersDiff
-        self._compareMethod2 = DeepDiffCompare
-        self._compareMethod3 = SequenceMatcherCompare
-        self._compareMethod4 = HirschbergCompare
-        self._allCompareMethods = [self._compareMethod1, self._compareMethod2, self._compareMethod3, self._compareMethod4]
+        # Short names of the registered engines, in menu order (see comparemethods.engines)
+        self._compareMethodNames = engines.names()
 
         self.pdfDTOLeft = PDFDTO()
         self.pdfDTORight = PDFDTO()
 
     def __LoadPDF(self, filePath, pdfDTO):
-        pdf = fitz.open(filePath)
-        words_pos = []
-        words_txt = []
-        
-        for page_num in range(pdf.page_count):
-            page1 = pdf.load_page(page_num)
-            dict1 = page1.get_text("rawdict")
-            page_words = self.chars_to_words(rawdict=dict1, page_num=page_num)
-            words_pos.extend(page_words)
-            words_txt.extend([w["text"] for w in page_words])
-            
+        metrics = Metrics()
+        with profiling("load"), metrics.stage("load"), self.registry.lock:
+            pdf = self.registry.acquire(filePath)
+            self.registry.release(pdfDTO.pdf_data)
+
+            key = self.registry.key(filePath)
+            loaded = None if self.out_of_core else self._word_cache.get((key, self.x_threshold))
+            source = "memory"
+            if self.out_of_core:
+                # Not cached: spill files are only kept while the document is loaded
+                with metrics.stage("spill"):
+                    words = outofcore.spill_words(
+                        pdf, lambda page: self.chars_to_word_columns(page.get_text("rawdict"), self.x_threshold),
+                        self._spill_vocab, self._spill_index, self.spill_dir)
+                # No word index: it would hold every word in memory again
+                loaded = (words, page_sizes(pdf), SpatialIndex(np.zeros((0, 4)), []))
+                source = "spilled"
+            elif loaded is None:
+                words = None
+                if self.cache is not None:
+                    cache_key = self.cache.key(filePath, x_threshold=self.x_threshold)
+                    with metrics.stage("disk_cache"):
+                        words = self.cache.get(cache_key)
+                    source = "disk"
+                if words is None:
+                    with metrics.stage("extract"):
+                        words = self._extract(filePath, pdf, metrics)
+                    if self.cache is not None:
+                        self.cache.put(cache_key, words)
+                    source = "extracted"
+                with metrics.stage("index"):
+                    loaded = (words, page_sizes(pdf), SpatialIndex(words.bbox, words.page_num))
+            if not self.out_of_core:
+                self._remember(self._word_cache, (key, self.x_threshold), loaded, self.WORD_CACHE_SIZE)
+
         pdfDTO.pdf_data = pdf
-        pdfDTO.words_pos = words_pos
-        pdfDTO.words_txt = words_txt
+        pdfDTO.words, pdfDTO.page_sizes, pdfDTO.index = loaded
+        pdfDTO.key = key
+        metrics.set("source", source)
+        metrics.set("pages", pdf.page_count)
+        metrics.set("words", len(pdfDTO.words))
+        metrics.set("peak_rss_mb", round(peak_rss_mb(), 1))
+        pdfDTO.metrics = metrics
+        
+    def _extract(self, filePath, pdf, metrics=None):
+        workers = min(self.extract_workers, pdf.page_count // self.PARALLEL_MIN_PAGES)
+        if workers > 1:
+            # Shards come back in page order; their stages can't be told apart from here
+            return WordTable.concat(self._parallel_extract(filePath, pdf.page_count, workers))
+        return self.extract_words(pdf, 0, pdf.page_count, self.x_threshold, metrics)
         
+    def select_compare_method(self, name):
+        """Select an engine by its short name (see _compareMethodNames), importing it if needed.
+
+        Raises ValueError for unknown names and engines.EngineUnavailable when
+        an optional package of the engine is missing."""
+        self._selectedCompareMethod = engines.load(name)
+
+    def result_key(self):
+        """Key of the result compare_pdf() would produce for the current files and settings."""
+        return (self.pdfDTOLeft.key, self.pdfDTORight.key, self.x_threshold,
+                self._spilled(self.pdfDTOLeft.words, self.pdfDTORight.words),
+                self.page_anchoring and self.region_words,
+                self.spatial_clustering and self.cluster_gap,
+                self.move_min_words,
+                self.visual_diff and self.raster_dpi,
+                self._selectedCompareMethod or engines.load(engines.DEFAULT))
+
+    @staticmethod
+    def _remember(cache, key, value, size):
+        """Insert into an OrderedDict used as an LRU of at most `size` entries."""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    def close(self):
+        """Release both documents back to the registry, and their spill files."""
+        for pdfDTO in (self.pdfDTOLeft, self.pdfDTORight):
+            self.registry.release(pdfDTO.pdf_data)
+            pdfDTO.pdf_data = None
+            if isinstance(pdfDTO.words, outofcore.SpilledWordTable):
+                pdfDTO.words.close()
+
+    @staticmethod
+    def _spilled(words_left, words_right):
+        """True if both documents are spill files over one vocabulary (out-of-core mode)."""
+        return (isinstance(words_left, outofcore.SpilledWordTable)
+                and isinstance(words_right, outofcore.SpilledWordTable)
+                and words_left.vocab is words_right.vocab)
+
     def LoadPDF_Left(self, filePath):
         self.__LoadPDF(filePath, self.pdfDTOLeft)
         
     def LoadPDF_Right(self, filePath):
         self.__LoadPDF(filePath, self.pdfDTORight)
+
+    def _parallel_extract(self, filePath, page_count, workers):
+        """Shard the page range over a process pool; each process opens its own document."""
+        n_shards = workers * self.SHARDS_PER_WORKER
+        step = -(-page_count // n_shards)
+        starts = list(range(0, page_count, step))
+        stops = [min(start + step, page_count) for start in starts]
+        # spawn, not fork: forking a process that runs Qt threads is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            return list(pool.map(_extract_page_range, [filePath] * len(starts), starts, stops,
+                                 [self.x_threshold] * len(starts)))
+
+    @staticmethod
+    def extract_words(pdf, start, stop, x_threshold=2.0, metrics=None):
+        """Return the words of pages [start, stop) as a WordTable, in page order.
+
+        With a Metrics, the time spent in fitz and in chars_to_word_columns is
+        added to its "fitz" and "chars_to_words" stages."""
+        metrics = metrics or Metrics()
+        def pages():
+            for page_num in range(start, stop):
+                with metrics.stage("fitz"):
+                    page1 = pdf.load_page(page_num)
+                    dict1 = page1.get_text("rawdict")
+                with metrics.stage("chars_to_words"):
+                    texts, bbox = PDFWorker.chars_to_word_columns(dict1, x_threshold=x_threshold)
+                yield texts, bbox, page_num
+        return WordTable.from_page_columns(pages())
             
-    def chars_to_words(self, rawdict, page_num=0, x_threshold=2.0):
+    @staticmethod
+    def chars_to_words(rawdict, page_num=0, x_threshold=2.0):
         words = []
 
         for block in rawdict.get("blocks", []):
@@ -109,81 +289,617 @@ class PDFWorker:
                     })
 
         return words
+
+    @staticmethod
+    def chars_to_word_columns(rawdict, x_threshold=2.0):
+        """Vectorized chars_to_words for one page: returns (texts, bbox array of shape (n, 4)).
+
+        Gives exactly the words of chars_to_words, but only the flattening of
+        rawdict runs in Python; word breaks and bboxes are computed with NumPy."""
+        # Flatten with C-level map/chain; MuPDF always fills "chars", "c" and "bbox"
+        chars, line_starts = [], []
+        for block in rawdict.get("blocks", []):
+            if block.get("type") != 0:  # only text blocks
+                continue
+            for line in block.get("lines", []):
+                line_starts.append(len(chars))
+                chars.extend(chain.from_iterable(map(_get_chars, line.get("spans", []))))
+        if not chars:
+            return [], np.zeros((0, 4), dtype=np.float64)
+
+        codes = list(map(_get_c, chars))
+        bbox = np.fromiter(chain.from_iterable(map(_get_bbox, chars)),
+                           dtype=np.float64, count=4 * len(chars)).reshape(-1, 4)
+        text = "".join(codes)
+        if len(text) == len(codes) and "" not in codes:
+            # One code point per char: look the code points up in the whitespace table
+            points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+            space = _IS_SPACE[np.minimum(points, len(_IS_SPACE) - 1)]
+        else:  # some chars are empty or longer than one code point
+            space = np.fromiter((not c.strip() for c in codes), dtype=bool, count=len(codes))
+
+        # A word starts at a visible char that opens a line, follows a space,
+        # or is more than x_threshold away from the previous char's x1
+        starts = np.zeros(len(chars), dtype=bool)
+        starts[[k for k in line_starts if k < len(chars)]] = True
+        starts[1:] |= space[:-1] | (np.abs(bbox[1:, 0] - bbox[:-1, 2]) > x_threshold)
+        visible = ~space
+        starts = starts[visible]
+        bbox = bbox[visible]
+        if not len(bbox):
+            return [], np.zeros((0, 4), dtype=np.float64)
+
+        # The first char gives x0/y0; x1/y1 grow to the largest of the word's chars
+        first = np.flatnonzero(starts)
+        word_bbox = bbox[first].copy()
+        word_bbox[:, 2] = np.maximum.reduceat(bbox[:, 2], first)
+        word_bbox[:, 3] = np.maximum.reduceat(bbox[:, 3], first)
+
+        visible_codes = list(compress(codes, visible.tolist()))
+        text = "".join(visible_codes)
+        if len(text) == len(visible_codes):
+            offsets = first.tolist()
+        else:
+            offsets = np.concatenate(([0], np.cumsum([len(c) for c in visible_codes])))[first].tolist()
+        offsets.append(len(text))
+        texts = [text[offsets[k]:offsets[k + 1]] for k in range(len(first))]
+        return texts, word_bbox
     
     def group_adjacent_words(self, diffs, words, distance_threshold=20.0, line_threshold=5.0):
+        diffs = [(idx, change_type) for idx, change_type in diffs if 0 <= idx < len(words)]
+        if not diffs:
+            return []
+        # Fetch the columns of all diff words at once instead of word by word
+        indices = np.fromiter((idx for idx, _ in diffs), dtype=np.int64, count=len(diffs))
+        boxes = words.bbox[indices].tolist()
+        pages = words.page_num[indices].tolist()
+        vocab = words.vocab
+        texts = dict(zip(indices.tolist(), (vocab[t] for t in words.token_ids[indices].tolist())))
+
         grouped = []
         current_group = None
-        for idx, change_type in diffs:
-            if idx < 0 or idx >= len(words):
-                continue
-            w = words[idx]
-            text = w["text"]
-            bbox = fitz.Rect(w["bbox"])
-            page = w["page_num"]
-            if current_group is None:
-                current_group = {
-                    "page": page,
-                    "bbox": bbox,
-                    "text": text,
-                    "change_type": change_type,
-                    "last_bbox": bbox
-                }
-                continue
-            same_page = (page == current_group["page"])
-            same_type = (change_type == current_group["change_type"])
-            prev_bbox = current_group["last_bbox"]
-            # Check if on same line or paragraph (vertical proximity)
-            vertical_close = abs(bbox.y0 - prev_bbox.y0) < line_threshold or abs(bbox.y1 - prev_bbox.y1) < line_threshold
-            horizontal_close = (bbox.x0 - prev_bbox.x1) < distance_threshold
-            if same_page and same_type and (vertical_close or horizontal_close):
-                # merge with current group
-                current_group["text"] += " " + text
-                current_group["bbox"] = fitz.Rect(
-                    min(current_group["bbox"].x0, bbox.x0),
-                    min(current_group["bbox"].y0, bbox.y0),
-                    max(current_group["bbox"].x1, bbox.x1),
-                    max(current_group["bbox"].y1, bbox.y1)
-                )
-                current_group["last_bbox"] = bbox
-            else:
-                grouped.append({
-                    "page": current_group["page"],
-                    "bbox": current_group["bbox"],
-                    "text": current_group["text"],
-                    "change_type": current_group["change_type"]
-                })
-                current_group = {
-                    "page": page,
-                    "bbox": bbox,
-                    "text": text,
-                    "change_type": change_type,
-                    "last_bbox": bbox
-                }
-        if current_group:
-            grouped.append({
-                "page": current_group["page"],
-                "bbox": current_group["bbox"],
-                "text": current_group["text"],
-                "change_type": current_group["change_type"]
-            })
+        for (idx, change_type), bbox, page in zip(diffs, boxes, pages):
+            if current_group is not None:
+                same_page = (page == current_group["page"])
+                same_type = (change_type == current_group["change_type"])
+                prev_bbox = current_group["last_bbox"]
+                # Check if on same line or paragraph (vertical proximity)
+                vertical_close = abs(bbox[1] - prev_bbox[1]) < line_threshold or abs(bbox[3] - prev_bbox[3]) < line_threshold
+                horizontal_close = (bbox[0] - prev_bbox[2]) < distance_threshold
+                if same_page and same_type and (vertical_close or horizontal_close):
+                    # merge with current group
+                    current_group["text"].append(texts[idx])
+                    group_bbox = current_group["bbox"]
+                    current_group["bbox"] = [min(group_bbox[0], bbox[0]), min(group_bbox[1], bbox[1]),
+                                             max(group_bbox[2], bbox[2]), max(group_bbox[3], bbox[3])]
+                    current_group["last_bbox"] = bbox
+                    continue
+                grouped.append(self._finish_group(current_group))
+            current_group = {
+                "page": page,
+                "bbox": bbox,
+                "text": [texts[idx]],
+                "change_type": change_type,
+                "last_bbox": bbox
+            }
+        grouped.append(self._finish_group(current_group))
         return grouped
 
-    def compare_pdf(self):
-        selected_method = self._selectedCompareMethod or self._compareMethod1
-        model = selected_method([w["text"] for w in self.pdfDTOLeft.words_pos],
-                                    [w["text"] for w in self.pdfDTORight.words_pos])
-        self.added_diffs, self.removed_diffs = model.get_diff_as_string()
-                
-        added_diffs = [(idx, "added") for idx, _ in self.added_diffs]
-        removed_diffs = [(idx, "removed") for idx, _ in self.removed_diffs]
-        all_diffs = added_diffs + removed_diffs
+    @staticmethod
+    def _finish_group(group):
+        return {
+            "page": group["page"],
+            "bbox": fitz.Rect(group["bbox"]),
+            "text": " ".join(group["text"]),
+            "change_type": group["change_type"]
+        }
+
+    @staticmethod
+    def cluster_groups(groups, gap=12.0):
+        """Merge groups of the same change type whose bboxes are at most `gap` points apart on a page.
+
+        group_adjacent_words only merges neighbours in reading order; this also
+        joins changes that are close on the page, e.g. the cells of one table row."""
+        if len(groups) < 2:
+            return list(groups)
+        index = SpatialIndex([tuple(g["bbox"]) for g in groups], [g["page"] for g in groups])
+        parent = list(range(len(groups)))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in index.pairs_within(gap):
+            if groups[i]["change_type"] == groups[j]["change_type"]:
+                parent[root(j)] = root(i)
+
+        # Members stay in their original order; a cluster sits where its first member was
+        clusters = {}
+        for i, group in enumerate(groups):
+            clusters.setdefault(root(i), []).append(group)
+        merged = []
+        for members in clusters.values():
+            first = members[0]
+            bbox = fitz.Rect(first["bbox"])
+            for member in members[1:]:
+                bbox |= member["bbox"]
+            merged.append({
+                "page": first["page"],
+                "bbox": bbox,
+                "text": " ".join(m["text"] for m in members),
+                "change_type": first["change_type"]
+            })
+        return merged
+
+    def compare_pdf(self, progress=None):
+        """Diff the loaded PDFs and store the grouped result in _differences.
+
+        progress is an optional callable(percent, stage) invoked between stages.
+        It may raise CompareCancelled to abort; nothing is stored in that case."""
+        for _ in self.iter_compare(progress):
+            pass
+
+    def iter_compare(self, progress=None):
+        """Diff the loaded PDFs and yield the result region by region, in page order.
+
+        Each item is (differences, added, removed) for one run of changed pages:
+        the grouped (page, bbox, text, change_type) tuples of that run and its
+        word-level (index, word) lists. Once the generator is exhausted the
+        full result is stored exactly as compare_pdf() stores it. Move
+        detection needs every region, so in the stored result words of moved
+        blocks are no longer added/removed but part of movedetect.MovedBlock
+        differences; the streamed regions still show them as added and removed.
+
+        Stage timings and counters of the run are collected in self.metrics."""
+        # Take local references so a reload on another thread can't swap data mid-run
+        words_left = self.pdfDTOLeft.words
+        words_right = self.pdfDTORight.words
+        result_key = self.result_key()
+        metrics = self.metrics = Metrics()
+        metrics.set("pages", len(self.pdfDTOLeft.page_sizes) + len(self.pdfDTORight.page_sizes))
+        metrics.set("words", len(words_left) + len(words_right))
+
+        cached = self._result_cache.get(result_key)
+        if cached is not None:
+            self._report(progress, 100, "Done")
+            self.added_diffs, self.removed_diffs, self._differences = cached
+            self.differences_key = result_key
+            self._count_result(metrics, cached=True)
+            yield self._differences, self.added_diffs, self.removed_diffs
+            return
+
+        selected_method = result_key[-1]
+        spilled = self._spilled(words_left, words_right)
+        added, removed = [], []
+        removed_groups, added_groups = [], []
+        with profiling("compare"):
+            if spilled:
+                engine_runs = self._iter_engine_spilled(selected_method, words_left, words_right, progress, metrics)
+            else:
+                engine_runs = self._iter_engine(selected_method, words_left, words_right,
+                                                anchor_pages=self.page_anchoring, progress=progress, metrics=metrics)
+            for run_added, run_removed in self._whole_page_runs(engine_runs, words_left, words_right):
+                run_removed_groups, run_added_groups = self._group_changes(run_added, run_removed,
+                                                                           words_left, words_right, metrics)
+                added.extend(run_added)
+                removed.extend(run_removed)
+                removed_groups.extend(run_removed_groups)
+                added_groups.extend(run_added_groups)
+                yield run_removed_groups + run_added_groups, run_added, run_removed
+
+            moved_groups = []
+            if self.move_min_words:
+                self._report(progress, 90, "Detecting moved blocks")
+                with metrics.stage("moves"):
+                    removed_idx, added_idx = [idx for idx, _ in removed], [idx for idx, _ in added]
+                    if spilled:
+                        # Ids are already shared; only read the changed words from the spill files
+                        left_ids = dict(zip(removed_idx, words_left.token_ids[removed_idx].tolist()))
+                        right_ids = dict(zip(added_idx, words_right.token_ids[added_idx].tolist()))
+                    else:
+                        left_ids, right_ids = shared_token_ids(words_left, words_right)
+                    blocks = movedetect.find_moves(left_ids, right_ids, removed_idx, added_idx, self.move_min_words)
+                    moved_groups = movedetect.moved_differences(words_left, words_right, blocks)
+                metrics.set("moved_blocks", len(moved_groups))
+                if blocks:
+                    moved_left = {i for start, _, length in blocks for i in range(start, start + length)}
+                    moved_right = {j for _, start, length in blocks for j in range(start, start + length)}
+                    removed = [(idx, w) for idx, w in removed if idx not in moved_left]
+                    added = [(idx, w) for idx, w in added if idx not in moved_right]
+                    removed_groups, added_groups = self._group_changes(added, removed, words_left, words_right,
+                                                                       metrics)
+
+            visual_groups = []
+            if self.visual_diff:
+                self._report(progress, 95, "Comparing page images")
+                with metrics.stage("visual"):
+                    visual_groups = self._visual_differences(self.pdfDTOLeft, self.pdfDTORight, progress)
+                metrics.set("visual_changes", len(visual_groups))
+                if visual_groups:
+                    yield visual_groups, [], []
 
-        # Group adjacent word changes
-        grouped_diffs = (self.group_adjacent_words(removed_diffs, self.pdfDTOLeft.words_pos) 
-                        + self.group_adjacent_words(added_diffs, self.pdfDTORight.words_pos))
+        self._report(progress, 100, "Done")
 
         # Store for visualizing later
-        self._differences = [
-            (g["page"], g["bbox"], g["text"], g["change_type"])
-            for g in grouped_diffs
-        ]
+        self.added_diffs, self.removed_diffs = added, removed
+        self._differences = removed_groups + added_groups + moved_groups + visual_groups
+        self.differences_key = result_key
+        self._count_result(metrics, cached=False)
+        # Only cache if neither side was reloaded while this ran
+        if words_left is self.pdfDTOLeft.words and words_right is self.pdfDTORight.words:
+            self._remember(self._result_cache, result_key,
+                           (added, removed, self._differences), self.RESULT_CACHE_SIZE)
+
+    @staticmethod
+    def _whole_page_runs(engine_runs, words_left, words_right):
+        """Regroup engine runs of (added, removed) so that no page's changes are split over two runs.
+
+        Regions and out-of-core windows can end in the middle of a page, but
+        groups and clusters never span pages, so grouping whole pages gives the
+        groups of an unsplit compare. The changes on the last changed page of
+        each side are held back until the next run, which may add to them."""
+        def split_last_page(changes, page_num):
+            if not changes:
+                return [], []
+            last_page = page_num[changes[-1][0]]
+            k = len(changes)
+            while k and page_num[changes[k - 1][0]] == last_page:
+                k -= 1
+            return changes[:k], changes[k:]
+
+        held_added, held_removed = [], []
+        for run_added, run_removed in engine_runs:
+            run_added, held_added = split_last_page(held_added + run_added, words_right.page_num)
+            run_removed, held_removed = split_last_page(held_removed + run_removed, words_left.page_num)
+            if run_added or run_removed:
+                yield run_added, run_removed
+        if held_added or held_removed:
+            yield held_added, held_removed
+
+    def _group_changes(self, added, removed, words_left, words_right, metrics):
+        """Group word-level changes into (page, bbox, text, change_type) tuples: (removed groups, added groups)."""
+        with metrics.stage("group"):
+            removed_groups = self.group_adjacent_words([(idx, "removed") for idx, _ in removed], words_left)
+            added_groups = self.group_adjacent_words([(idx, "added") for idx, _ in added], words_right)
+        if self.spatial_clustering:
+            with metrics.stage("cluster"):
+                removed_groups = self.cluster_groups(removed_groups, self.cluster_gap)
+                added_groups = self.cluster_groups(added_groups, self.cluster_gap)
+        return ([(g["page"], g["bbox"], g["text"], g["change_type"]) for g in removed_groups],
+                [(g["page"], g["bbox"], g["text"], g["change_type"]) for g in added_groups])
+
+    def _count_result(self, metrics, cached):
+        metrics.set("cached", cached)
+        metrics.set("edit_distance", len(self.added_diffs) + len(self.removed_diffs))
+        metrics.set("groups", len(self._differences))
+        metrics.set("peak_rss_mb", round(peak_rss_mb(), 1))
+
+    def metrics_report(self):
+        """Stage timings and counters of the loaded documents and the last compare, JSON-ready."""
+        return {"left": self.pdfDTOLeft.metrics.as_dict(),
+                "right": self.pdfDTORight.metrics.as_dict(),
+                "compare": self.metrics.as_dict()}
+
+    def _run_engine(self, method, words_left, words_right, anchor_pages=False):
+        """Run a compare engine and return its (added, removed) lists of (index, word)."""
+        added, removed = [], []
+        for run_added, run_removed in self._iter_engine(method, words_left, words_right, anchor_pages):
+            added.extend(run_added)
+            removed.extend(run_removed)
+        return added, removed
+
+    def _iter_engine(self, method, words_left, words_right, anchor_pages=False, progress=None, metrics=None):
+        """Run a compare engine and yield its (added, removed) lists of (index, word) run by run.
+
+        Engines that set accepts_token_ids get integer token ids from a shared
+        vocabulary; their results are mapped back to the word texts here.
+        With anchor_pages the engine only sees the runs of pages that are not
+        identical on both sides, one run at a time; indices are still global.
+        Timings go to the "tokenize", "anchor" and "engine" stages of metrics."""
+        metrics = metrics or Metrics()
+        with metrics.stage("tokenize"):
+            left_ids, right_ids = shared_token_ids(words_left, words_right)
+        left_texts, right_texts = words_left.texts, words_right.texts
+        with metrics.stage("anchor"):
+            if anchor_pages:
+                runs = self._changed_page_runs(words_left, words_right, left_ids, right_ids)
+                if self.region_words:
+                    runs = [region for run in runs
+                            for region in self._split_run(run, left_ids, right_ids, self.region_words)]
+            else:
+                runs = [(0, len(left_ids), 0, len(right_ids))]
+            runs = [run for run in runs if run[0] != run[1] or run[2] != run[3]]
+        metrics.set("regions", len(runs))
+
+        if getattr(method, "accepts_token_ids", False):
+            left_input, right_input = left_ids, right_ids
+        else:
+            left_input, right_input = left_texts, right_texts
+
+        total = max(1, sum(l_end - l_start + r_end - r_start for l_start, l_end, r_start, r_end in runs))
+        done = 0
+        for number, (l_start, l_end, r_start, r_end) in enumerate(runs, 1):
+            self._report(progress, 100 * done // total, f"Comparing words (region {number} of {len(runs)})")
+            with metrics.stage("engine"):
+                run_added, run_removed = method(left_input[l_start:l_end],
+                                                right_input[r_start:r_end]).get_diff_as_string()
+                run_added = [(r_start + idx, right_texts[r_start + idx]) for idx, _ in run_added]
+                run_removed = [(l_start + idx, left_texts[l_start + idx]) for idx, _ in run_removed]
+            yield run_added, run_removed
+            done += l_end - l_start + r_end - r_start
+
+    def _iter_engine_spilled(self, method, words_left, words_right, progress, metrics):
+        """_iter_engine for spilled documents: diff in windows that fit under memory_limit_mb.
+
+        Identical pages are matched by digest first. Each remaining run is read
+        at most a window of words per side at a time; the window is cut into
+        regions at anchors (see _split_run), and the words after its last anchor
+        are read again by the next window. Without any anchor the window is cut
+        where it ends. See outofcore for what that costs against a global diff."""
+        with metrics.stage("anchor"):
+            left_offsets, right_offsets = words_left.page_offsets(), words_right.page_offsets()
+            if self.page_anchoring:
+                runs = self._page_runs(outofcore.page_fingerprints(words_left, left_offsets),
+                                       outofcore.page_fingerprints(words_right, right_offsets),
+                                       left_offsets, right_offsets)
+            else:
+                runs = [(0, len(words_left), 0, len(words_right))]
+        vocab = words_left.vocab
+        token_input = getattr(method, "accepts_token_ids", False)
+        window = outofcore.window_words(self.memory_limit_mb, current_rss_mb())
+        total = max(1, sum(l_end - l_start + r_end - r_start for l_start, l_end, r_start, r_end in runs))
+        done = windows = forced_cuts = 0
+        for l_start, l_end, r_start, r_end in runs:
+            i, j = l_start, r_start
+            while i < l_end or j < r_end:
+                self._report(progress, 100 * done // total, f"Comparing words (window {windows + 1})")
+                with metrics.stage("anchor"):
+                    left = words_left.token_ids[i:min(i + window, l_end)].tolist()
+                    right = words_right.token_ids[j:min(j + window, r_end)].tolist()
+                    last = i + len(left) == l_end and j + len(right) == r_end
+                    regions = self._split_run((0, len(left), 0, len(right)), left, right, window // 4)
+                    if not last:
+                        if len(regions) > 1:
+                            regions.pop()  # re-read from the last anchor by the next window
+                        else:
+                            forced_cuts += 1
+                for a_start, a_end, b_start, b_end in regions:
+                    if a_start == a_end and b_start == b_end:
+                        continue
+                    left_input, right_input = left[a_start:a_end], right[b_start:b_end]
+                    if not token_input:
+                        left_input = [vocab[t] for t in left_input]
+                        right_input = [vocab[t] for t in right_input]
+                    with metrics.stage("engine"):
+                        run_added, run_removed = method(left_input, right_input).get_diff_as_string()
+                        run_added = [(j + b_start + idx, vocab[right[b_start + idx]]) for idx, _ in run_added]
+                        run_removed = [(i + a_start + idx, vocab[left[a_start + idx]]) for idx, _ in run_removed]
+                    yield run_added, run_removed
+                windows += 1
+                done += regions[-1][1] + regions[-1][3]
+                words_left.release(i, i + regions[-1][1])
+                words_right.release(j, j + regions[-1][3])
+                i, j = i + regions[-1][1], j + regions[-1][3]
+                del left, right
+                if current_rss_mb() > self.memory_limit_mb:
+                    window = max(outofcore.MIN_WINDOW, window // 2)
+        metrics.set("windows", windows)
+        metrics.set("forced_cuts", forced_cuts)
+        metrics.set("window_words", window)
+
+    def _visual_differences(self, pdfDTOLeft, pdfDTORight, progress=None):
+        """Raster-compare matched pages that have images or no text; returns difference tuples.
+
+        The words are masked out before comparing, so text changes are not
+        reported twice. Pairs found in page_images are compared as they are.
+        The rest are rendered over a process pool on private document handles
+        if there are many, else from the loaded documents. In-process fitz
+        work takes the registry lock one page at a time, so the viewers and
+        other workers are not held up for the whole run. progress is called
+        before each rendered pair and may raise CompareCancelled."""
+        lock = self.registry.lock
+        pairs = self._visual_page_pairs(pdfDTOLeft, pdfDTORight, lock)
+        if not pairs:
+            return []
+        left_path, right_path = pdfDTOLeft.pdf_data.name, pdfDTORight.pdf_data.name
+        masks = []
+        for pdfDTO, side_pages in ((pdfDTOLeft, {lp for lp, _ in pairs}), (pdfDTORight, {rp for _, rp in pairs})):
+            offsets = np.searchsorted(pdfDTO.words.page_num, np.arange(len(pdfDTO.page_sizes) + 1)).tolist()
+            masks.append({p: pdfDTO.words.bbox[offsets[p]:offsets[p + 1]].tolist() for p in side_pages})
+        masks_left, masks_right = masks
+
+        scale = self.raster_dpi / 72
+        results = {}
+        for lp, rp in pairs:
+            left_image, right_image = self.page_images.get(("left", lp)), self.page_images.get(("right", rp))
+            if left_image is not None and right_image is not None:
+                left_image, right_image = left_image.copy(), right_image.copy()
+                rasterdiff.mask_image(left_image, masks_left.get(lp, ()), scale)
+                rasterdiff.mask_image(right_image, masks_right.get(rp, ()), scale)
+                results[(lp, rp)] = rasterdiff.diff_images(left_image, right_image, scale)
+
+        todo = [pair for pair in pairs if pair not in results]
+        workers = min(self.extract_workers, len(todo) // self.RASTER_PARALLEL_MIN_PAGES)
+        if workers > 1:
+            step = -(-len(todo) // (workers * self.SHARDS_PER_WORKER))
+            shards = [todo[k:k + step] for k in range(0, len(todo), step)]
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                shard_results = pool.map(rasterdiff.diff_page_pairs, [left_path] * len(shards), [right_path] * len(shards),
+                                         shards, [self.raster_dpi] * len(shards),
+                                         [{lp: masks_left[lp] for lp, _ in shard} for shard in shards],
+                                         [{rp: masks_right[rp] for _, rp in shard} for shard in shards])
+                for shard, shard_result in zip(shards, shard_results):
+                    results.update(zip(shard, shard_result))
+        else:
+            for number, (lp, rp) in enumerate(todo, 1):
+                self._report(progress, 95, f"Comparing page images ({number} of {len(todo)})")
+                with lock:
+                    left_image = rasterdiff.render_gray(pdfDTOLeft.pdf_data[lp], self.raster_dpi, masks_left[lp])
+                with lock:
+                    right_image = rasterdiff.render_gray(pdfDTORight.pdf_data[rp], self.raster_dpi, masks_right[rp])
+                results[(lp, rp)] = rasterdiff.diff_images(left_image, right_image, scale)
+
+        differences = []
+        for lp, rp in pairs:
+            for bbox, ink_left, ink_right in results[(lp, rp)]:
+                if ink_left:
+                    differences.append((lp, fitz.Rect(bbox), rasterdiff.VISUAL_CHANGE, "removed"))
+                if ink_right:
+                    differences.append((rp, fitz.Rect(bbox), rasterdiff.VISUAL_CHANGE, "added"))
+        return differences
+
+    @staticmethod
+    def _visual_page_pairs(pdfDTOLeft, pdfDTORight, lock):
+        """(left page, right page) pairs worth rasterizing.
+
+        Pages are aligned by their word sequence: identical pages pair up, and
+        the pages between two identical pairs pair up in order. Only pairs
+        where a page has an image or no words at all are kept. lock guards
+        the fitz calls that look for images (see rasterdiff.image_pages)."""
+        if PDFWorker._spilled(pdfDTOLeft.words, pdfDTORight.words):
+            # Ids are shared already; page bytes keep the fingerprints small
+            left_ids, right_ids = pdfDTOLeft.words.token_ids, pdfDTORight.words.token_ids
+            page_key = lambda ids, s, e: ids[s:e].tobytes()
+        else:
+            left_ids, right_ids = shared_token_ids(pdfDTOLeft.words, pdfDTORight.words)
+            page_key = lambda ids, s, e: tuple(ids[s:e])
+        pages, offsets = [], []
+        for pdfDTO, ids in ((pdfDTOLeft, left_ids), (pdfDTORight, right_ids)):
+            page_offsets = np.searchsorted(pdfDTO.words.page_num, np.arange(len(pdfDTO.page_sizes) + 1)).tolist()
+            pages.append([page_key(ids, s, e) for s, e in zip(page_offsets, page_offsets[1:])])
+            offsets.append(page_offsets)
+        left_pages, right_pages = pages
+        left_offsets, right_offsets = offsets
+
+        pairs = []
+        prev_i = prev_j = 0
+        for i, j in PDFWorker._align_pages(left_pages, right_pages) + [(len(left_pages), len(right_pages))]:
+            # Changed pages between two identical pairs pair up in order
+            pairs.extend(zip(range(prev_i, i), range(prev_j, j)))
+            if i < len(left_pages) and j < len(right_pages):
+                pairs.append((i, j))
+            prev_i, prev_j = i + 1, j + 1
+
+        left_images = rasterdiff.image_pages(pdfDTOLeft.pdf_data, lock)
+        right_images = rasterdiff.image_pages(pdfDTORight.pdf_data, lock)
+        # Pages without words are always worth a look
+        return [(lp, rp) for lp, rp in pairs
+                if lp in left_images or rp in right_images
+                or left_offsets[lp] == left_offsets[lp + 1] or right_offsets[rp] == right_offsets[rp + 1]]
+
+    # Words that must match on both sides of a region boundary
+    REGION_ANCHOR_CONTEXT = 8
+
+    @classmethod
+    def _split_run(cls, run, left_ids, right_ids, region_words):
+        """Cut a run into regions of roughly region_words words at long matching stretches.
+
+        A cut is only made at a word that occurs exactly once on each side of the
+        run and sits in the middle of REGION_ANCHOR_CONTEXT equal words before and
+        after it, so any reasonable diff would align it anyway."""
+        l_start, l_end, r_start, r_end = run
+        if (l_end - l_start) + (r_end - r_start) <= 2 * region_words:
+            return [run]
+
+        left_count, right_count = {}, {}
+        for token in left_ids[l_start:l_end]:
+            left_count[token] = left_count.get(token, 0) + 1
+        right_pos = {}
+        for j in range(r_start, r_end):
+            token = right_ids[j]
+            right_count[token] = right_count.get(token, 0) + 1
+            right_pos[token] = j
+        # Words unique on both sides, in left order, with their right positions
+        pairs = [(i, right_pos[left_ids[i]]) for i in range(l_start, l_end)
+                 if left_count[left_ids[i]] == 1 and right_count.get(left_ids[i]) == 1]
+
+        # Keep the longest chain whose right positions increase too (patience sorting)
+        tails, tail_idx, prev = [], [], [None] * len(pairs)
+        for k, (_, j) in enumerate(pairs):
+            pos = bisect.bisect_left(tails, j)
+            if pos:
+                prev[k] = tail_idx[pos - 1]
+            if pos == len(tails):
+                tails.append(j)
+                tail_idx.append(k)
+            else:
+                tails[pos] = j
+                tail_idx[pos] = k
+        chain = []
+        k = tail_idx[-1] if tail_idx else None
+        while k is not None:
+            chain.append(pairs[k])
+            k = prev[k]
+        chain.reverse()
+
+        context = cls.REGION_ANCHOR_CONTEXT
+        regions = []
+        cut_i, cut_j = l_start, r_start
+        for i, j in chain:
+            if (i - cut_i) + (j - cut_j) < 2 * region_words:
+                continue
+            if i - context < cut_i or j - context < cut_j or i + context >= l_end or j + context >= r_end:
+                continue
+            if left_ids[i - context:i + context + 1] != right_ids[j - context:j + context + 1]:
+                continue
+            regions.append((cut_i, i, cut_j, j))
+            cut_i, cut_j = i, j
+        regions.append((cut_i, l_end, cut_j, r_end))
+        return regions
+
+    @staticmethod
+    def _changed_page_runs(words_left, words_right, left_ids, right_ids):
+        """Align pages by their exact word sequence and return the word ranges left between matches.
+
+        Each run is (left_start, left_end, right_start, right_end) covering the
+        pages between two identical page pairs."""
+        left_offsets, right_offsets = words_left.page_offsets(), words_right.page_offsets()
+        return PDFWorker._page_runs([tuple(left_ids[s:e]) for s, e in zip(left_offsets, left_offsets[1:])],
+                                    [tuple(right_ids[s:e]) for s, e in zip(right_offsets, right_offsets[1:])],
+                                    left_offsets, right_offsets)
+
+    @staticmethod
+    def _align_pages(left_pages, right_pages):
+        """(left page, right page) index pairs of identical pages, in order.
+
+        Pages are given as any hashable fingerprint of their words."""
+        # Same fingerprint -> same page id, so the page lists can be diffed like words
+        fingerprints = {}
+        left_pages = [fingerprints.setdefault(page, len(fingerprints)) for page in left_pages]
+        right_pages = [fingerprints.setdefault(page, len(fingerprints)) for page in right_pages]
+        added_pages, removed_pages = LinearMyersDiff(left_pages, right_pages).get_diff_as_string()
+        added_pages = {p for p, _ in added_pages}
+        removed_pages = {p for p, _ in removed_pages}
+
+        matches = []
+        i = j = 0
+        while i < len(left_pages) or j < len(right_pages):
+            if i < len(left_pages) and i in removed_pages:
+                i += 1
+            elif j < len(right_pages) and j in added_pages:
+                j += 1
+            else:
+                matches.append((i, j))
+                i += 1
+                j += 1
+        return matches
+
+    @staticmethod
+    def _page_runs(left_pages, right_pages, left_offsets, right_offsets):
+        """Word ranges between identical pages; pages are given as any hashable fingerprint."""
+        runs = []
+        run_i = run_j = 0
+        for i, j in PDFWorker._align_pages(left_pages, right_pages) + [(len(left_pages), len(right_pages))]:
+            # Close the run of changed pages before the identical pair (or the end)
+            if (run_i, run_j) != (i, j):
+                runs.append((left_offsets[run_i], left_offsets[i], right_offsets[run_j], right_offsets[j]))
+            run_i, run_j = i + 1, j + 1
+        return runs
+
+    @staticmethod
+    def _report(progress, percent, stage):
+        if progress:
+            progress(percent, stage)
@@ -0,0 +1,137 @@
+"""Pixel-level comparison of rendered pages, for content without a text layer.
+
+Scanned pages, charts and images never reach the word diff. Here matched
+page pairs are rendered in grayscale at low DPI with the text masked out,
+compared block by block, and the changed areas come back as bboxes in
+PDF points."""
+import math
+
+import pymupdf as fitz
+import numpy as np
+
+# `text` of the differences produced here
+VISUAL_CHANGE = "[visual change]"
+# Side of the square blocks that are hashed and compared, in pixels
+BLOCK = 16
+# Gray levels two pixels may differ by before they count as changed (absorbs anti-aliasing)
+PIXEL_TOLERANCE = 48
+# A block only counts as changed with at least this many changed pixels
+MIN_CHANGED_PIXELS = 4
+
+# Fixed random weights make the block hash a cheap dot product
+_WEIGHTS = np.random.default_rng(0x5EED).integers(1, 2 ** 63, size=BLOCK * BLOCK, dtype=np.uint64)
+
+
+def render_gray(page, dpi, mask_boxes=()):
+    """Render a page as a uint8 grayscale array; mask_boxes (PDF points) are painted white."""
+    scale = dpi / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].copy()
+    mask_image(image, mask_boxes, scale)
+    return image
+
+
+def mask_image(image, boxes, scale):
+    """Paint the given boxes (PDF points) white, so only non-text content gets compared."""
+    for x0, y0, x1, y1 in boxes:
+        image[max(0, int(y0 * scale)):math.ceil(y1 * scale), max(0, int(x0 * scale)):math.ceil(x1 * scale)] = 255
+
+
+def _blocks(image, height, width):
+    """Pad to height x width with white and view as a (rows, cols, BLOCK, BLOCK) grid of blocks."""
+    padded = np.full((height, width), 255, dtype=np.uint8)
+    padded[:image.shape[0], :image.shape[1]] = image
+    return padded.reshape(height // BLOCK, BLOCK, width // BLOCK, BLOCK).swapaxes(1, 2)
+
+
+def changed_boxes(left, right):
+    """Compare two grayscale images; return the changed areas as pixel boxes (x0, y0, x1, y1).
+
+    Blocks are hashed first; only blocks whose hashes differ are compared
+    pixel by pixel. Changed blocks that touch (including diagonally) form
+    one area, whose box is tightened to the changed pixels."""
+    height = -(-max(left.shape[0], right.shape[0]) // BLOCK) * BLOCK
+    width = -(-max(left.shape[1], right.shape[1]) // BLOCK) * BLOCK
+    blocks_left, blocks_right = _blocks(left, height, width), _blocks(right, height, width)
+    rows, cols = blocks_left.shape[:2]
+
+    flat_left = blocks_left.reshape(rows, cols, BLOCK * BLOCK)
+    flat_right = blocks_right.reshape(rows, cols, BLOCK * BLOCK)
+    differ = (flat_left * _WEIGHTS).sum(axis=2) != (flat_right * _WEIGHTS).sum(axis=2)
+    if not differ.any():
+        return []
+
+    candidates = np.argwhere(differ)
+    pixels = np.abs(blocks_left[differ].astype(np.int16) - blocks_right[differ]) > PIXEL_TOLERANCE
+    keep = pixels.sum(axis=(1, 2)) >= MIN_CHANGED_PIXELS
+    candidates, pixels = candidates[keep], pixels[keep]
+    if not len(candidates):
+        return []
+
+    # Tight pixel box inside each changed block
+    any_row, any_col = pixels.any(axis=2), pixels.any(axis=1)
+    y0 = candidates[:, 0] * BLOCK + any_row.argmax(axis=1)
+    y1 = candidates[:, 0] * BLOCK + BLOCK - any_row[:, ::-1].argmax(axis=1)
+    x0 = candidates[:, 1] * BLOCK + any_col.argmax(axis=1)
+    x1 = candidates[:, 1] * BLOCK + BLOCK - any_col[:, ::-1].argmax(axis=1)
+    block_boxes = dict(zip(map(tuple, candidates.tolist()), zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())))
+
+    # Connected areas of changed blocks
+    boxes = []
+    unvisited = set(block_boxes)
+    while unvisited:
+        stack = [unvisited.pop()]
+        bx0, by0, bx1, by1 = block_boxes[stack[0]]
+        while stack:
+            r, c = stack.pop()
+            x0_, y0_, x1_, y1_ = block_boxes[(r, c)]
+            bx0, by0, bx1, by1 = min(bx0, x0_), min(by0, y0_), max(bx1, x1_), max(by1, y1_)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    neighbour = (r + dr, c + dc)
+                    if neighbour in unvisited:
+                        unvisited.remove(neighbour)
+                        stack.append(neighbour)
+        boxes.append((bx0, by0, bx1, by1))
+    boxes.sort(key=lambda b: (b[1], b[0]))
+    return boxes
+
+
+def has_ink(image, box):
+    """True if the image has any non-white pixel inside the pixel box."""
+    x0, y0, x1, y1 = box
+    return bool((image[y0:y1, x0:x1] < 255 - PIXEL_TOLERANCE).any())
+
+
+def diff_images(left, right, scale):
+    """Changed areas of two page images as (bbox in PDF points, ink on left, ink on right)."""
+    return [(tuple(v / scale for v in box), has_ink(left, box), has_ink(right, box))
+            for box in changed_boxes(left, right)]
+
+
+def diff_page_pairs(left_path, right_path, pairs, dpi, masks_left, masks_right):
+    """Process-pool entry point: open private handles and diff each (left page, right page) pair.
+
+    masks_* map page numbers to the word boxes that are blanked out first.
+    Returns one diff_images() result per pair."""
+    left, right = fitz.open(left_path), fitz.open(right_path)
+    try:
+        scale = dpi / 72
+        return [diff_images(render_gray(left[lp], dpi, masks_left.get(lp, ())),
+                            render_gray(right[rp], dpi, masks_right.get(rp, ())), scale)
+                for lp, rp in pairs]
+    finally:
+        left.close()
+        right.close()
+
+
+def image_pages(pdf, lock):
+    """Numbers of the pages of an open document that show at least one image.
+
+    lock is held for one page at a time, so other fitz users get a turn in between."""
+    pages = set()
+    for page_num in range(pdf.page_count):
+        with lock:
+            if pdf[page_num].get_images():
+                pages.add(page_num)
+    return pages
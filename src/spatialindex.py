@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def page_sizes(pdf):
+    """(width, height) of every page in PDF points, as a float64 array of shape (pages, 2)."""
+    sizes = np.zeros((pdf.page_count, 2), dtype=np.float64)
+    for page_num in range(pdf.page_count):
+        rect = pdf.load_page(page_num).rect
+        sizes[page_num] = rect.width, rect.height
+    return sizes
+
+
+class SpatialIndex:
+    """Uniform grid over boxes spread across pages.
+
+    Every box is registered in each CELL_SIZE x CELL_SIZE cell it touches on
+    its page. The (page, cell) keys are kept sorted, so a lookup is a few
+    binary searches plus an exact overlap test on the candidates. Built with
+    NumPy in one pass; boxes are word or difference bboxes in PDF points."""
+    CELL_SIZE = 32.0
+    # Cell coordinates are packed into 16 bits each
+    MAX_CELL = 0xFFFF
+
+    def __init__(self, bbox, page_num, cell_size=CELL_SIZE):
+        self.bbox = np.asarray(bbox, dtype=np.float64).reshape(-1, 4)
+        self.page_num = np.asarray(page_num, dtype=np.int64)
+        self.cell_size = cell_size
+        self._keys, self._items = self._entries(self.bbox, self.page_num, 0)
+
+    def extend(self, bbox, page_num):
+        """Add boxes after the existing ones; only the new boxes are expanded over their cells,
+        then merged into the sorted keys."""
+        bbox = np.asarray(bbox, dtype=np.float64).reshape(-1, 4)
+        page_num = np.asarray(page_num, dtype=np.int64)
+        keys, items = self._entries(bbox, page_num, len(self.bbox))
+        # After equal keys, so entries stay ordered by box index within a cell
+        at = np.searchsorted(self._keys, keys, side="right")
+        self._keys = np.insert(self._keys, at, keys)
+        self._items = np.insert(self._items, at, items)
+        self.bbox = np.concatenate((self.bbox, bbox))
+        self.page_num = np.concatenate((self.page_num, page_num))
+
+    def _entries(self, bbox, page_num, first):
+        """Sorted cell keys of the boxes, and the box index (counted from first) of each."""
+        cx0, cy0 = self._cell(bbox[:, 0]), self._cell(bbox[:, 1])
+        cx1 = np.maximum(self._cell(bbox[:, 2]), cx0)
+        cy1 = np.maximum(self._cell(bbox[:, 3]), cy0)
+        widths = cx1 - cx0 + 1
+        counts = widths * (cy1 - cy0 + 1)
+
+        # One entry per (box, cell) pair: expand each box over its cell block
+        items = np.repeat(np.arange(first, first + len(bbox)), counts)
+        within = np.arange(len(items)) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = np.repeat(widths, counts)
+        cx = np.repeat(cx0, counts) + within % widths
+        cy = np.repeat(cy0, counts) + within // widths
+        keys = self._key(np.repeat(page_num, counts), cy, cx)
+
+        order = np.argsort(keys, kind="stable")
+        return keys[order], items[order]
+
+    def __len__(self):
+        return len(self.bbox)
+
+    def _cell(self, coords):
+        return np.clip(np.floor(coords / self.cell_size), 0, self.MAX_CELL).astype(np.int64)
+
+    @staticmethod
+    def _key(page, cy, cx):
+        return (page << 32) | (cy << 16) | cx
+
+    def query(self, page, rect):
+        """Indices (ascending) of the boxes on `page` that overlap rect=(x0, y0, x1, y1)."""
+        x0, y0, x1, y1 = rect
+        cx0, cx1 = self._cell(np.array([x0, x1]))
+        cy0, cy1 = self._cell(np.array([y0, y1]))
+        # Each grid row of the rectangle is one contiguous key range
+        rows = np.arange(cy0, cy1 + 1)
+        lo = np.searchsorted(self._keys, self._key(page, rows, cx0), side="left")
+        hi = np.searchsorted(self._keys, self._key(page, rows, cx1), side="right")
+        if not (hi > lo).any():
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate([self._items[a:b] for a, b in zip(lo, hi)]))
+        boxes = self.bbox[candidates]
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return candidates[hit]
+
+    def at(self, page, x, y, tolerance=0.0):
+        """Indices of the boxes on `page` that contain the point (x, y), give or take tolerance."""
+        return self.query(page, (x - tolerance, y - tolerance, x + tolerance, y + tolerance))
+
+    def pairs_within(self, gap):
+        """(i, j) pairs, i < j, of boxes on the same page that are at most `gap` points apart."""
+        pairs = set()
+        for i in range(len(self.bbox)):
+            x0, y0, x1, y1 = self.bbox[i]
+            for j in self.query(int(self.page_num[i]), (x0 - gap, y0 - gap, x1 + gap, y1 + gap)).tolist():
+                if j > i:
+                    pairs.add((i, j))
+        return sorted(pairs)
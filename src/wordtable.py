@@ -0,0 +1,133 @@
+from array import array
+
+import numpy as np
+
+
+class WordTable:
+    """Columnar store for the words of one document.
+
+    Instead of a dict per word, the table keeps NumPy columns:
+      bbox       float64 (n, 4)  x0, y0, x1, y1 in PDF points
+      page_num   int32   (n,)
+      token_ids  int32   (n,)    index into vocab
+    and each distinct word text only once in `vocab`."""
+    def __init__(self, vocab=None, token_ids=None, bbox=None, page_num=None):
+        self.vocab = vocab if vocab is not None else []
+        self.token_ids = token_ids if token_ids is not None else np.zeros(0, dtype=np.int32)
+        self.bbox = bbox if bbox is not None else np.zeros((0, 4), dtype=np.float64)
+        self.page_num = page_num if page_num is not None else np.zeros(0, dtype=np.int32)
+        self._texts = None
+
+    @classmethod
+    def from_pages(cls, pages):
+        """Build a table from an iterable of chars_to_words() results, one list per page."""
+        vocab, index = [], {}
+        ids, coords, page_nums = array("i"), array("d"), array("i")
+        for page_words in pages:
+            for w in page_words:
+                text = w["text"]
+                token = index.get(text)
+                if token is None:
+                    token = index[text] = len(vocab)
+                    vocab.append(text)
+                ids.append(token)
+                coords.extend(w["bbox"])
+                page_nums.append(w["page_num"])
+        return cls(vocab,
+                   np.frombuffer(ids, dtype=np.int32).copy(),
+                   np.frombuffer(coords, dtype=np.float64).reshape(-1, 4).copy(),
+                   np.frombuffer(page_nums, dtype=np.int32).copy())
+
+    @classmethod
+    def from_page_columns(cls, pages):
+        """Build a table from an iterable of (texts, bbox array, page_num), one tuple per page."""
+        vocab, index = [], {}
+        ids, coords, page_nums = [], [], []
+        for texts, bbox, page_num in pages:
+            page_ids = np.empty(len(texts), dtype=np.int32)
+            for k, text in enumerate(texts):
+                token = index.get(text)
+                if token is None:
+                    token = index[text] = len(vocab)
+                    vocab.append(text)
+                page_ids[k] = token
+            ids.append(page_ids)
+            coords.append(np.asarray(bbox, dtype=np.float64).reshape(-1, 4))
+            page_nums.append(np.full(len(texts), page_num, dtype=np.int32))
+        if not ids:
+            return cls()
+        return cls(vocab, np.concatenate(ids), np.concatenate(coords), np.concatenate(page_nums))
+
+    @classmethod
+    def from_words(cls, words):
+        return cls.from_pages([words])
+
+    @classmethod
+    def concat(cls, tables):
+        """Concatenate tables in order, merging their vocabularies."""
+        if not tables:
+            return cls()
+        index = {}  # text -> merged id, in order of first appearance
+        ids = []
+        for table in tables:
+            remap = np.fromiter((index.setdefault(t, len(index)) for t in table.vocab),
+                                dtype=np.int32, count=len(table.vocab))
+            ids.append(remap[table.token_ids])
+        return cls(list(index),
+                   np.concatenate(ids).astype(np.int32, copy=False),
+                   np.concatenate([t.bbox for t in tables]),
+                   np.concatenate([t.page_num for t in tables]))
+
+    def __len__(self):
+        return len(self.token_ids)
+
+    def __getitem__(self, idx):
+        """Dict view of one word, same shape as a chars_to_words() entry."""
+        return {"text": self.text(idx), "bbox": self.bbox[idx].tolist(), "page_num": self.page(idx)}
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def text(self, idx):
+        return self.vocab[self.token_ids[idx]]
+
+    def bbox_of(self, idx):
+        """(x0, y0, x1, y1) of one word as Python floats."""
+        return tuple(self.bbox[idx].tolist())
+
+    def page(self, idx):
+        return int(self.page_num[idx])
+
+    @property
+    def texts(self):
+        """Word texts as a list of shared vocab strings (built once, then cached)."""
+        if self._texts is None:
+            vocab = self.vocab
+            self._texts = [vocab[t] for t in self.token_ids.tolist()]
+        return self._texts
+
+    def page_offsets(self):
+        """Word index where each page starts: words of page p are [offsets[p], offsets[p+1])."""
+        page_count = int(self.page_num[-1]) + 1 if len(self.page_num) else 0
+        return np.searchsorted(self.page_num, np.arange(page_count + 1), side="left").tolist()
+
+    def nbytes(self):
+        """Approximate memory held by the columns and vocabulary."""
+        return (self.token_ids.nbytes + self.bbox.nbytes + self.page_num.nbytes
+                + sum(len(t) + 49 for t in self.vocab))
+
+
+def shared_token_ids(left, right):
+    """Map two WordTables onto one vocabulary and return their token ids as int lists.
+
+    Equal words get equal ids on both sides, so diff engines can compare
+    small ints instead of strings."""
+    index = {}
+    ids = []
+    for table in (left, right):
+        remap = np.fromiter((index.setdefault(t, len(index)) for t in table.vocab),
+                            dtype=np.int32, count=len(table.vocab))
+        # Plain lists: engines index element by element, which is slow on NumPy arrays
+        ids.append(remap[table.token_ids].tolist())
+    return ids[0], ids[1]
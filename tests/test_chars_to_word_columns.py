@@ -0,0 +1,66 @@
+"""chars_to_word_columns() must give exactly the words of chars_to_words()."""
+import os
+import random
+
+import pymupdf as fitz
+import pytest
+
+from src.pdfworker import PDFWorker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chars that take the slow path or are easy to misclassify as (non-)whitespace
+EDGE_CHARS = ["", " ", "\t", "\x00", "\x1c", "\x85", "\u00a0", "\u2003", "\u2028", "\u3000", "\u200b",
+              "\ufeff", "e\u0301", "fi", "\U0001F600", "\u00df"]
+
+
+def assert_same_words(rawdict, x_threshold=2.0):
+    words = PDFWorker.chars_to_words(rawdict, x_threshold=x_threshold)
+    texts, bbox = PDFWorker.chars_to_word_columns(rawdict, x_threshold=x_threshold)
+    assert texts == [w["text"] for w in words]
+    assert bbox.shape == (len(words), 4)
+    assert bbox.tolist() == [w["bbox"] for w in words]
+
+
+@pytest.mark.parametrize("name", ["bp2left.pdf", "bp2right.pdf"])
+def test_bundled_pages(name):
+    with fitz.open(os.path.join(REPO_ROOT, name)) as pdf:
+        for page in pdf:
+            assert_same_words(page.get_text("rawdict"))
+
+
+def random_rawdict(rng):
+    """A rawdict as MuPDF makes it (every char has "c" and "bbox"), with edge chars and gaps near the threshold."""
+    blocks = []
+    for _ in range(rng.randint(0, 4)):
+        if rng.random() < 0.1:
+            blocks.append({"type": 1})  # image block
+            continue
+        lines = []
+        for _ in range(rng.randint(0, 4)):
+            x, y = rng.uniform(0, 500), rng.uniform(0, 700)
+            spans = []
+            for _ in range(rng.randint(0, 3)):
+                chars = []
+                for _ in range(rng.randint(0, 12)):
+                    c = rng.choice(EDGE_CHARS) if rng.random() < 0.3 else rng.choice("abcxyz019.")
+                    x += rng.choice([0.0, 0.0, 0.5, 1.9, 2.0, 2.1, 5.0, -3.0])  # gap to the previous char
+                    width = rng.uniform(0, 8)
+                    chars.append({"c": c, "bbox": (x, y, x + width, y + rng.uniform(5, 12))})
+                    x += width
+                spans.append({"chars": chars})
+            lines.append({"spans": spans})
+        blocks.append({"type": 0, "lines": lines})
+    return {"blocks": blocks}
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_rawdicts(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        assert_same_words(random_rawdict(rng), x_threshold=rng.choice([0.0, 2.0, 10.0]))
+
+
+def test_empty_page():
+    assert_same_words({})
+    assert_same_words({"blocks": [{"type": 0, "lines": [{"spans": [{"chars": []}]}]}]})
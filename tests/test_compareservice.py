@@ -0,0 +1,141 @@
+"""The compare service over HTTP on an ephemeral localhost port."""
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from src import compareservice
+from src.compareservice import CompareService, QueueFull, make_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEFT = os.path.join(REPO_ROOT, "bp2left.pdf")
+RIGHT = os.path.join(REPO_ROOT, "bp2right.pdf")
+TIMEOUT = 60
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Jobs start running but don't compare until gate.set(); gate.started is set once one is running."""
+    gate = threading.Event()
+    gate.started = threading.Event()
+    run_pair = compareservice.run_pair
+
+    def gated_run_pair(*args, **kwargs):
+        gate.started.set()
+        assert gate.wait(TIMEOUT)
+        return run_pair(*args, **kwargs)
+
+    monkeypatch.setattr(compareservice, "run_pair", gated_run_pair)
+    yield gate
+    gate.set()
+
+
+@pytest.fixture
+def service():
+    service = CompareService(workers=1, queue_size=1)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.port = server.server_address[1]
+    yield service
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def request(service, method, path, body=None, headers=None):
+    """Send a request; returns (status, headers, decoded JSON payload)."""
+    connection = http.client.HTTPConnection("127.0.0.1", service.port, timeout=TIMEOUT)
+    try:
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.headers, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_submit_and_wait(service):
+    status, _, job = request(service, "POST", "/compare", {"left": LEFT, "right": RIGHT, "wait": True})
+    assert status == 200
+    assert job["status"] == "ok" and job["exit_code"] == 1
+    assert job["differences"]
+
+    status, _, again = request(service, "GET", f"/jobs/{job['id']}")
+    assert status == 200
+    assert again["differences"] == job["differences"]
+
+    status, _, health = request(service, "GET", "/health")
+    assert status == 200
+    assert health["finished"] == 1 and health["running"] == 0 and health["queued"] == 0
+
+
+def test_queue_full_and_cancel(service, gate):
+    status, headers, running = request(service, "POST", "/compare", {"left": LEFT, "right": RIGHT})
+    assert status == 202 and headers["Location"] == f"/jobs/{running['id']}"
+    assert gate.started.wait(TIMEOUT)
+    status, _, queued = request(service, "POST", "/compare", {"left": LEFT, "right": RIGHT})
+    assert status == 202 and queued["status"] == "queued"
+
+    status, headers, refused = request(service, "POST", "/compare", {"left": LEFT, "right": RIGHT})
+    assert status == 503
+    assert headers["Retry-After"] == str(compareservice.RETRY_AFTER)
+
+    status, _, cancelled = request(service, "DELETE", f"/jobs/{queued['id']}")
+    assert status == 200 and cancelled["status"] == "cancelled"
+
+    # A running job stops at its next progress report
+    status, _, job = request(service, "DELETE", f"/jobs/{running['id']}")
+    assert status == 200
+    gate.set()
+    assert service.job(running["id"]).done.wait(TIMEOUT)
+    assert service.job(running["id"]).status == "cancelled"
+
+
+@pytest.mark.parametrize("body, headers", [
+    ("{not json", None),
+    ({"left": LEFT}, None),
+    ([LEFT, RIGHT], None),
+    ({"left": LEFT, "right": RIGHT, "method": "no-such-engine"}, None),
+    ("", {"Content-Length": "-1"}),
+    ("", {"Content-Length": "many"}),
+])
+def test_bad_request(service, body, headers):
+    status, _, payload = request(service, "POST", "/compare", body, headers)
+    assert status == 400
+    assert payload["error"]
+
+
+@pytest.mark.parametrize("method, path", [
+    ("GET", "/jobs/no-such-job"),
+    ("DELETE", "/jobs/no-such-job"),
+    ("GET", "/nowhere"),
+    ("POST", "/nowhere"),
+])
+def test_not_found(service, method, path):
+    status, _, payload = request(service, method, path, {})
+    assert status == 404
+    assert payload["error"]
+
+
+def test_close_cancels_queued_jobs(gate):
+    service = CompareService(workers=1, queue_size=1)
+    running = service.submit(LEFT, RIGHT)
+    assert gate.started.wait(TIMEOUT)
+    queued = service.submit(LEFT, RIGHT)
+
+    closer = threading.Thread(target=service.close)
+    closer.start()
+    assert queued.done.wait(TIMEOUT)  # cancelled without waiting for the running job
+    assert queued.status == "cancelled"
+    with pytest.raises(QueueFull):
+        service.submit(LEFT, RIGHT)
+
+    gate.set()
+    closer.join(TIMEOUT)
+    assert not closer.is_alive()
+    assert running.status == "ok"  # running jobs finish
+    assert len(service.registry) == 0
@@ -0,0 +1,105 @@
+"""Compare engines must give valid, and where promised minimal, diffs."""
+import random
+
+import pytest
+
+from comparemethods.hirschbergcompare import HirschbergCompare
+from comparemethods.histogramdiff import HistogramDiff
+from comparemethods.linearmyersdiff import LinearMyersDiff
+from comparemethods.myersdiff import MyersDiff
+
+
+def replay(a, b, added, removed):
+    """Apply a diff to a and return the result; it must come out as b for a valid diff."""
+    assert [i for i, _ in removed] == sorted({i for i, _ in removed})
+    assert [j for j, _ in added] == sorted({j for j, _ in added})
+    assert all(a[i] == word for i, word in removed)
+    assert all(b[j] == word for j, word in added)
+    removed_idx = {i for i, _ in removed}
+    kept = iter([word for i, word in enumerate(a) if i not in removed_idx])
+    added_words = dict(added)
+    return [added_words[j] if j in added_words else next(kept, None) for j in range(len(b))] + list(kept)
+
+
+def random_pair(rng, alphabet, max_words=60):
+    """Two word lists over `alphabet` words, b an edited copy of a, or unrelated.
+
+    a is never empty: MyersDiff can't diff two empty lists (PDFWorker never asks it to)."""
+    words = [f"w{k}" for k in range(alphabet)]
+    a = [rng.choice(words) for _ in range(rng.randint(1, max_words))]
+    if rng.random() < 0.2:
+        return a, [rng.choice(words) for _ in range(rng.randint(0, max_words))]
+    b = []
+    for word in a:
+        r = rng.random()
+        if r < 0.1:
+            continue  # deleted
+        if r < 0.2:
+            b.append(rng.choice(words))  # replaced
+            continue
+        b.append(word)
+        if r > 0.9:
+            b.append(rng.choice(words))  # inserted
+    return a, b
+
+
+def cases(count=500, max_words=60):
+    rng = random.Random(0)
+    return [random_pair(rng, rng.choice([2, 5, 26]), max_words) for _ in range(count)]
+
+
+def myers_distance(a, b):
+    added, removed = MyersDiff(a, b).get_diff_as_string()
+    return len(added) + len(removed)
+
+
+@pytest.mark.parametrize("a, b", cases())
+def test_linear_myers_matches_myers(a, b):
+    added, removed = LinearMyersDiff(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
+    # Both are minimal; among equally short scripts they may pick different ones
+    assert len(added) + len(removed) == myers_distance(a, b)
+
+
+def test_linear_myers_token_ids():
+    a, b = [3, 1, 4, 1, 5, 9, 2, 6], [3, 1, 5, 9, 2, 7, 6]
+    added, removed = LinearMyersDiff(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
+    assert len(added) + len(removed) == 3
+
+
+@pytest.mark.parametrize("a, b", [([], []), (["x"], []), ([], ["x"]), (["x", "y"], ["x", "y"])])
+def test_linear_myers_trivial(a, b):
+    added, removed = LinearMyersDiff(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
+    assert len(added) + len(removed) == len(a) + len(b) - 2 * len(set(a) & set(b))
+
+
+def test_linear_myers_tie_break():
+    # Equally short scripts: MyersDiff keeps "a" as the second word of b, LinearMyersDiff as the last
+    a, b = ["a"], ["b", "a", "a"]
+    assert LinearMyersDiff(a, b).get_diff_as_string() == ([(0, "b"), (1, "a")], [])
+    assert [tuple(change) for change in MyersDiff(a, b).get_diff_as_string()[0]] == [(0, "b"), (2, "a")]
+
+
+# Long enough that Hirschberg splits above SMALL_CELLS and histogram runs out of unique anchors
+@pytest.mark.parametrize("a, b", cases(100, max_words=400))
+def test_hirschberg_is_minimal(a, b):
+    added, removed = HirschbergCompare(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
+    assert len(added) + len(removed) == myers_distance(a, b)
+
+
+@pytest.mark.parametrize("a, b", cases(100, max_words=400))
+def test_histogram_is_valid(a, b):
+    # Anchoring on rare words can miss a shorter script, so only validity is promised
+    added, removed = HistogramDiff(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
+
+
+@pytest.mark.parametrize("engine", [HirschbergCompare, HistogramDiff])
+@pytest.mark.parametrize("a, b", [([], []), (["x"], []), ([], ["x"]), (["x", "y"], ["x", "y"]),
+                                  (["the"] * 100 + ["x"], ["the"] * 99 + ["y"])])
+def test_edge_cases(engine, a, b):
+    added, removed = engine(a, b).get_diff_as_string()
+    assert replay(a, b, added, removed) == b
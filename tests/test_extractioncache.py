@@ -0,0 +1,104 @@
+"""ExtractionCache round trips, misses and eviction."""
+import os
+import shutil
+
+import numpy as np
+
+from src.extractioncache import ExtractionCache
+from src.pdfworker import PDFWorker
+from src.wordtable import WordTable
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def word_table(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = ["Straße", "naïve", "\U0001F600", "x" * 40, "§"] + [f"w{k}" for k in range(n)]
+    return WordTable(vocab, rng.integers(0, len(vocab), n, dtype=np.int32),
+                     rng.uniform(0, 800, (n, 4)), np.sort(rng.integers(0, 20, n, dtype=np.int32)))
+
+
+def assert_same_table(cached, words):
+    assert cached.vocab == words.vocab
+    for name in ExtractionCache.COLUMNS:
+        column = getattr(cached, name)
+        assert column.dtype == getattr(words, name).dtype
+        assert np.array_equal(column, getattr(words, name))
+    assert cached.texts == words.texts
+
+
+def test_round_trip(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    words = word_table(1000)
+    assert cache.get("entry") is None
+    cache.put("entry", words)
+    assert_same_table(cache.get("entry"), words)
+
+
+def test_round_trip_of_an_extracted_document(tmp_path):
+    path = os.path.join(REPO_ROOT, "bp2left.pdf")
+    worker = PDFWorker(extract_workers=1, cache=ExtractionCache(str(tmp_path)))
+    try:
+        worker.LoadPDF_Left(path)
+        assert worker.pdfDTOLeft.metrics.as_dict()["counters"]["source"] == "extracted"
+        extracted = worker.pdfDTOLeft.words
+    finally:
+        worker.close()
+
+    worker = PDFWorker(extract_workers=1, cache=ExtractionCache(str(tmp_path)))
+    try:
+        worker.LoadPDF_Left(path)
+        assert worker.pdfDTOLeft.metrics.as_dict()["counters"]["source"] == "disk"
+        assert_same_table(worker.pdfDTOLeft.words, extracted)
+    finally:
+        worker.close()
+
+
+def test_changed_file_misses(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    path = str(tmp_path / "doc.pdf")
+    shutil.copyfile(os.path.join(REPO_ROOT, "bp2left.pdf"), path)
+    key = cache.key(path, x_threshold=2.0)
+    cache.put(key, word_table(10))
+
+    # Same bytes under another name still hit; other parameters don't
+    copy = str(tmp_path / "copy.pdf")
+    shutil.copyfile(path, copy)
+    assert cache.key(copy, x_threshold=2.0) == key
+    assert cache.key(path, x_threshold=3.0) != key
+
+    with open(path, "ab") as f:
+        f.write(b"\n% appended\n")
+    changed = cache.key(path, x_threshold=2.0)
+    assert changed != key
+    assert cache.get(changed) is None
+
+
+def entry_size(cache, key):
+    entry = os.path.join(cache.cache_dir, key)
+    return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+
+def test_lru_eviction(tmp_path):
+    probe = ExtractionCache(str(tmp_path / "probe"))
+    probe.put("probe", word_table(1000))
+    size = entry_size(probe, "probe")
+
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=3 * size + size // 2)
+    for k in range(3):
+        cache.put(f"entry{k}", word_table(1000, seed=k))
+        # mtimes are the LRU clock; space them out so the order is unambiguous on coarse filesystems
+        os.utime(os.path.join(cache.cache_dir, f"entry{k}"), (k, k))
+    assert cache.get("entry0") is not None  # now the most recently used
+    cache.put("entry3", word_table(1000, seed=3))
+
+    entries = sorted(name for name in os.listdir(cache.cache_dir) if not name.startswith("."))
+    assert entries == ["entry0", "entry2", "entry3"]  # entry1 was the least recently used
+    assert sum(entry_size(cache, name) for name in entries) <= cache.max_bytes
+
+
+def test_newest_entry_survives_a_tiny_cap(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=1)
+    cache.put("old", word_table(100))
+    cache.put("new", word_table(100, seed=1))
+    assert os.listdir(tmp_path) == ["new"]
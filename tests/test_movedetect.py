@@ -0,0 +1,51 @@
+"""find_moves() pairs removed and added blocks of identical words."""
+from comparemethods.linearmyersdiff import LinearMyersDiff
+from src.movedetect import MIN_WORDS, find_moves
+
+
+def block(start, length):
+    return list(range(start, start + length))
+
+
+def test_relocated_paragraph_is_one_move():
+    first, second, third = block(100, 20), block(200, 12), block(300, 20)
+    left, right = first + second + third, first + third + second
+    added, removed = LinearMyersDiff(left, right).get_diff_as_string()
+    blocks = find_moves(left, right, [i for i, _ in removed], [j for j, _ in added])
+    assert blocks == [(20, 40, 12)]  # reported once, at full length
+
+
+def test_short_block_is_not_a_move():
+    moved = block(100, MIN_WORDS - 1)
+    left, right = moved + block(200, 30), block(200, 30) + moved
+    assert find_moves(left, right, list(range(len(moved))), list(range(30, 30 + len(moved)))) == []
+    assert find_moves(left, right, list(range(len(moved))), list(range(30, 30 + len(moved))),
+                      min_words=len(moved)) == [(0, 30, len(moved))]
+
+
+def test_repeated_blocks_are_paired_once_each():
+    moved = block(100, 10)
+    # The block was removed twice and added three times: two moves, and the third copy stays added
+    left = moved + [1] + moved
+    right = moved + [2] + moved + [3] + moved
+    removed = list(range(len(left)))
+    added = list(range(len(right)))
+    blocks = find_moves(left, right, removed, added)
+    assert blocks == [(0, 0, 10), (11, 11, 10)]
+    used = [i for start, _, length in blocks for i in range(start, start + length)]
+    assert len(used) == len(set(used))
+
+
+def test_block_stops_at_the_end_of_a_run():
+    moved = block(100, 10)
+    left, right = moved, moved
+    # Word 5 was not removed on the left, so no block may run through it
+    removed = [0, 1, 2, 3, 4, 6, 7, 8, 9]
+    assert find_moves(left, right, removed, list(range(10)), min_words=3) == [(0, 0, 5), (6, 6, 4)]
+
+
+def test_dict_ids():
+    moved = block(100, 10)
+    left_ids = dict(zip(range(50, 60), moved))
+    right_ids = dict(zip(range(7, 17), moved))
+    assert find_moves(left_ids, right_ids, list(range(50, 60)), list(range(7, 17))) == [(50, 7, 10)]
@@ -0,0 +1,29 @@
+"""An out-of-core compare must report what the in-memory compare reports."""
+import io
+import json
+import os
+
+import pytest
+
+import cli
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAIR = [os.path.join(REPO_ROOT, "bp2left.pdf"), os.path.join(REPO_ROOT, "bp2right.pdf")]
+
+
+def run(*options):
+    out = io.StringIO()
+    cli.run(cli.parse_args(["--format", "json", "-j", "1", *options, *PAIR]), out)
+    record, = json.loads(out.getvalue())
+    assert record["status"] == "ok", record.get("error")
+    return record
+
+
+@pytest.mark.parametrize("method", ["myers", "linear-myers"])
+def test_spilled_equals_in_memory(method):
+    in_memory = run("--method", method)
+    # 1 MB is far below the process RSS, so the window shrinks to its minimum
+    spilled = run("--method", method, "--memory-limit", "1")
+    assert spilled["metrics"]["compare"]["counters"]["windows"] > 1
+    assert spilled["differences"] == in_memory["differences"]
+    assert spilled["differences"]
@@ -0,0 +1,31 @@
+"""Cutting a compare into regions must not change its grouped differences."""
+import os
+
+import pytest
+
+from src.pdfworker import PDFWorker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def compare(region_words, spatial_clustering):
+    worker = PDFWorker(extract_workers=1)
+    worker.region_words = region_words
+    worker.spatial_clustering = spatial_clustering
+    worker.move_min_words = 0
+    try:
+        worker.LoadPDF_Left(os.path.join(REPO_ROOT, "bp2left.pdf"))
+        worker.LoadPDF_Right(os.path.join(REPO_ROOT, "bp2right.pdf"))
+        streamed = [difference for differences, _, _ in worker.iter_compare() for difference in differences]
+        return worker._differences, streamed, worker.metrics.as_dict()["counters"]["regions"]
+    finally:
+        worker.close()
+
+
+@pytest.mark.parametrize("spatial_clustering", [False, True])
+def test_regions_cut_mid_page(spatial_clustering):
+    whole, _, whole_regions = compare(0, spatial_clustering)
+    split, streamed, split_regions = compare(30, spatial_clustering)
+    assert split_regions > whole_regions  # regions of 30 words end inside pages
+    assert split == whole
+    assert sorted(streamed, key=repr) == sorted(split, key=repr)